@@ -0,0 +1,44 @@
+# Aggregate cube for the dashboard.
+#
+# Every chart and metric on the page is a mean or a sum over some subset of
+# (subject, date). Instead of grouping the raw rows again on each rerun, the
+# rows are reduced once into a (subject x date) cube of sums and row counts.
+# Any date range / subject selection is answered by slicing that cube (see
+# dataset.DateIndex), and the means are recovered as sum / n.
+
+MEAN_COLUMNS = ['percentage', '30_mark_scale', 'accuracy_rate',
+                'attempt_rate', 'penalty_rate']
+COUNT_COLUMNS = ['correct', 'incorrect', 'unattempted', 'no_of_questions']
+SUM_COLUMNS = MEAN_COLUMNS + COUNT_COLUMNS
+
+
+def build_cube(df):
+    sums = df[['subject', 'date']].join(df[SUM_COLUMNS].astype('float64'))
+    grouped = sums.groupby(['subject', 'date'], observed=True)
+    cube = grouped[SUM_COLUMNS].sum()
+    cube.insert(0, 'n', grouped.size())
+    # Date-major order so date ranges are contiguous slices of the cube
+    return cube.reset_index().sort_values(['date', 'subject'], ignore_index=True)
+
+
+def _means(cube, columns):
+    return cube[columns].div(cube['n'], axis=0)
+
+
+# Mean of each column over all rows in the slice
+def overall_means(cube, columns=MEAN_COLUMNS):
+    return cube[columns].sum() / cube['n'].sum()
+
+
+def subject_sums(cube, columns=COUNT_COLUMNS):
+    return cube.groupby('subject', observed=True)[columns].sum().reset_index()
+
+
+def subject_means(cube, columns=MEAN_COLUMNS):
+    grouped = cube.groupby('subject', observed=True)[['n'] + columns].sum()
+    return _means(grouped, columns).reset_index()
+
+
+def subject_date_means(cube, columns=MEAN_COLUMNS):
+    ordered = cube.sort_values(['subject', 'date'], ignore_index=True)
+    return ordered[['subject', 'date']].join(_means(ordered, columns))
@@ -0,0 +1,144 @@
+import argparse
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import query
+
+# Local HTTP/JSON API over the query engine.
+#
+# Serves the same numbers as the dashboard to other tools (reports, notebooks,
+# other front ends) without going through Streamlit. Only the standard library
+# is used; every response body comes from the engine's response cache and
+# carries an ETag, so unchanged results cost a lookup and a 304.
+#
+#     GET  /students
+#     GET  /<query>?student=alice&start=2025-01-01&end=2025-03-31&subject=Physics
+#     POST /batch   {"queries": [{"query": "summary", "student": "alice"}, ...]}
+#
+# where <query> is one of query.QUERIES. Run standalone with
+#
+#     python api.py --port 8502
+#
+# or inside the dashboard process by setting STUDENT_DASHBOARD_API_PORT.
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8502
+# Largest accepted batch request body
+MAX_BODY_BYTES = 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+# (host, port) -> running background server, so a re-created engine (e.g.
+# after Streamlit's resource cache is cleared) reuses the bound port
+_servers = {}
+_servers_lock = threading.Lock()
+
+
+class Handler(BaseHTTPRequestHandler):
+    engine = None
+
+    def _send(self, status, body, etag=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', f'"{etag}"')
+            self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, message):
+        self._send(status, query.encode({'error': message}))
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        name = url.path.strip('/')
+        if name == 'students':
+            return self._send(200, query.encode({'students': self.engine.students()}))
+        if name not in query.QUERIES:
+            return self._error(404, f"unknown endpoint: /{name}")
+
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            body, etag = self.engine.response(
+                name, params.get('student'), params.get('start'), params.get('end'), params.get('subject'),
+            )
+        except query.QueryError as error:
+            return self._error(400, str(error))
+        except Exception:
+            logger.exception("query failed: %s", self.path)
+            return self._error(500, "internal error")
+        if self.headers.get('If-None-Match') == f'"{etag}"':
+            self.send_response(304)
+            self.send_header('ETag', f'"{etag}"')
+            self.end_headers()
+            return
+        self._send(200, body, etag)
+
+    def do_POST(self):
+        if urlparse(self.path).path.strip('/') != 'batch':
+            return self._error(404, f"unknown endpoint: {self.path}")
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_BYTES:
+            return self._error(413, "request body too large")
+        try:
+            request = json.loads(self.rfile.read(length) or b'{}')
+            queries = request.get('queries') if isinstance(request, dict) else None
+            self._send(200, self.engine.batch(queries))
+        except ValueError as error:
+            # Malformed JSON or a malformed batch (QueryError)
+            self._error(400, str(error))
+        except Exception:
+            logger.exception("batch failed")
+            self._error(500, "internal error")
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+def make_server(engine, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    handler = type('EngineHandler', (Handler,), {'engine': engine})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+# Serve on a daemon thread; returns the server (call shutdown() to stop it).
+# A server already running on the same address is switched to `engine`.
+def serve_in_background(engine, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    with _servers_lock:
+        server = _servers.get((host, port))
+        if server is not None:
+            server.RequestHandlerClass.engine = engine
+            return server
+        server = _servers[(host, port)] = make_server(engine, host, port)
+    threading.Thread(target=server.serve_forever, name="query-api", daemon=True).start()
+    logger.info("query API listening on http://%s:%d", *server.server_address[:2])
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the dashboard's queries as JSON.")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    engine = query.QueryEngine()
+    engine.datasets.start_watching()
+    server = make_server(engine, args.host, args.port)
+    logger.info("query API listening on http://%s:%d", args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.datasets.stop_watching()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
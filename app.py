@@ -1,9 +1,20 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from datetime import datetime
 import numpy as np
+import math
+import os
+import time
+
+import api
+import dataset
+import export
+import figures
+import profiling
+import query
+import recommendations
+import registry
+import store
 
 # Set page configuration
 st.set_page_config(
@@ -57,23 +68,110 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Load the data
-@st.cache_data
-def load_data():
-    df = pd.read_excel(r"02062025-delhi-aiims-bsc-nursing-prepatory-data-set.xlsx")
-    df = df[['date', 'subject', 'no_of_questions', 'correct', 
-            'incorrect', 'unattempted', 'marks', 'total', 
-            'percentage', '30_mark_scale', 'accuracy_rate',
-            'attempt_rate', 'penalty_rate']]
-    df = df.dropna()
-    df['date'] = pd.to_datetime(df['date'], format='%d-%m-%Y')
-    
-    return df
-
-df = load_data()
+# Every export in the data directory is ingested into the per-student store
+# once per server process (see store.py). The registry then holds each
+# student's date-sorted rows, aggregate cube and filter indexes, and swaps in
+# updated datasets when new test days are appended (see registry.py). A
+# background thread watches the data directory and ingests changed exports
+# off the request path.
+@st.cache_resource(on_release=lambda datasets: datasets.stop_watching())
+def dataset_registry():
+    datasets = registry.DatasetRegistry()
+    datasets.start_watching()
+    return datasets
+
+# Derived views shared by all sessions, keyed on the normalized filter tuple
+# (see query.py). With STUDENT_DASHBOARD_API_PORT set, the same engine and its
+# caches are also served as a local JSON API (see api.py).
+@st.cache_resource
+def query_engine():
+    engine = query.QueryEngine(dataset_registry())
+    if os.environ.get("STUDENT_DASHBOARD_API_PORT"):
+        api.serve_in_background(engine, port=int(os.environ["STUDENT_DASHBOARD_API_PORT"]))
+    return engine
+
+# Finished figures shared by all sessions, keyed on a hash of each chart's input
+@st.cache_resource
+def figure_cache():
+    return figures.FigureCache()
+
+# Section timings and counters, aggregated across sessions (see profiling.py)
+@st.cache_resource
+def profiler():
+    return profiling.Profiler()
+
+profile_run = profiler().start_run()
+
+# Whether this script run only reruns fragments (a fragment's own rerun), in
+# which case the page-level run above was not started
+def fragment_rerun():
+    ctx = get_script_run_ctx()
+    return bool(ctx and ctx.fragment_ids_this_run)
+
+# Render a cached figure, timing the lookup/build plus Streamlit's own
+# serialization; the JSON size is only measured when profiling is logged
+def plot_chart(name, build, *inputs):
+    with profiling.section(f'chart.{name}'):
+        entry = figure_cache().entry(name, build, *inputs)
+        st.plotly_chart(entry.figure, width="stretch")
+    if profiler().log:
+        profiling.count('chart_json_bytes', len(entry.json))
+    return entry.figure
 
 # Header
 st.markdown("<h1 class='main-header'>Student Performance Dashboard</h1>", unsafe_allow_html=True)
 
+# Student selector
+students = dataset_registry().students()
+if not students:
+    st.warning(f"No valid results: no student exports were found in {dataset_registry().data_dir}.")
+    # Report this run before stopping; it would otherwise never finish
+    profile_run.finish()
+    st.stop()
+selected_student = st.sidebar.selectbox("Select Student", students)
+
+# Pick up newly exported test days now instead of at the next poll; the
+# refresh runs in the background and the status below follows it
+if st.sidebar.button("Check for New Results"):
+    if dataset_registry().refresh_in_background():
+        st.sidebar.info("Checking for new results...")
+    else:
+        st.sidebar.info("An update is already in progress.")
+
+with profiling.section('load_data'):
+    data = dataset_registry().get(selected_student)
+df = data.frame
+
+# Data freshness, re-checked every few seconds without a full rerun; when a
+# newer version of the shown student's data is published, the page reruns
+@st.fragment(run_every=registry.WATCH_INTERVAL or None)
+def data_status(student, shown_version):
+    with profiler().fragment('fragment.data_status', fragment_rerun()):
+        status = dataset_registry().status()
+        if status['refreshing']:
+            st.caption("🟡 Loading new results...")
+        elif status['error']:
+            st.caption(f"🔴 Last update failed: {status['error']}")
+        elif dataset_registry().get(student).version != shown_version:
+            st.rerun(scope="app")
+        else:
+            checked = "" if not status['watching'] else f", checked {time.time() - status['checked_at']:.0f}s ago"
+            st.caption(f"🟢 Up to date{checked}")
+
+with st.sidebar:
+    data_status(selected_student, data.version)
+
+# Every row of the export failed validation: nothing to filter or chart
+if df.empty:
+    rejected = dataset_registry().manifest['students'].get(selected_student, {}).get('rejected', 0)
+    st.warning(
+        f"No valid results for {selected_student}: all {rejected} rows of the export were rejected. "
+        f"See {store.rejected_path(selected_student, dataset_registry().store_dir)} for the reasons."
+    )
+    # Report this run before stopping; it would otherwise never finish
+    profile_run.finish()
+    st.stop()
+
 # Date range filter
 date_range = st.sidebar.date_input(
     "Select Date Range",
@@ -84,50 +182,47 @@ date_range = st.sidebar.date_input(
 
 if len(date_range) == 2:
     start_date, end_date = date_range
-    filtered_df = df[(df['date'].dt.date >= start_date) & (df['date'].dt.date <= end_date)]
 else:
-    filtered_df = df
+    start_date = end_date = None
 
 # Subject filter
 subjects = ["All"] + list(df['subject'].unique())
 selected_subject = st.sidebar.selectbox("Select Subject", subjects)
 
-if selected_subject != "All":
-    filtered_df = filtered_df[filtered_df['subject'] == selected_subject]
+# Filtering and every derived frame/metric are memoized per filter selection,
+# one section at a time: the cards need the overview, each tab fetches its own
+filters = (selected_student, start_date, end_date, None if selected_subject == "All" else selected_subject)
+with profiling.section('view'):
+    filtered_df = query_engine().rows(*filters)
+    view = query_engine().section('overview', *filters)
+profiling.count('rows_filtered', len(filtered_df))
 
 # Dashboard metrics section
 st.markdown("<h2 class='sub-header'>Overall Performance</h2>", unsafe_allow_html=True)
 
 # Calculate overall metrics
-avg_percentage = filtered_df['percentage'].mean()
-avg_accuracy = filtered_df['accuracy_rate'].mean() * 100
-avg_attempt_rate = filtered_df['attempt_rate'].mean() * 100
-avg_penalty_rate = filtered_df['penalty_rate'].mean() * 100
-
-# Define performance tiers
-def get_performance_tier(percentage):
-    if percentage >= 90:
-        return "Excellent", "#10b981"  # Green
-    elif percentage >= 75:
-        return "Good", "#059669"  # Green-blue
-    elif percentage >= 60:
-        return "Satisfactory", "#f59e0b"  # Yellow
-    else:
-        return "Needs Improvement", "#ef4444"  # Red
-
-performance_tier, tier_color = get_performance_tier(avg_percentage)
-
-# Calculate trends (comparing with the first half of the date range)
-mid_date = filtered_df['date'].min() + (filtered_df['date'].max() - filtered_df['date'].min()) / 2
-first_half = filtered_df[filtered_df['date'] < mid_date]
-second_half = filtered_df[filtered_df['date'] >= mid_date]
-
-if not first_half.empty and not second_half.empty:
-    percentage_trend = second_half['percentage'].mean() - first_half['percentage'].mean()
-    accuracy_trend = second_half['accuracy_rate'].mean() - first_half['accuracy_rate'].mean()
-    attempt_trend = second_half['attempt_rate'].mean() - first_half['attempt_rate'].mean()
-else:
-    percentage_trend = accuracy_trend = attempt_trend = 0
+overall = view['overall']
+avg_percentage = overall['percentage']
+avg_accuracy = overall['accuracy_rate'] * 100
+avg_attempt_rate = overall['attempt_rate'] * 100
+avg_penalty_rate = overall['penalty_rate'] * 100
+
+performance_tier, tier_color = view['performance_tier']
+
+# Trends compare the last 7 days' average with the last 30 days' average
+# at the end of the selected range
+percentage_trend = view['trends']['percentage']
+accuracy_trend = view['trends']['accuracy_rate']
+attempt_trend = view['trends']['attempt_rate']
+
+# Standing among all students over their whole history (None while the
+# cohort index is being built)
+cohort_index = dataset_registry().cohort()
+standing = None
+if cohort_index is not None:
+    standing = cohort_index.student_standing(
+        selected_student, (None if selected_subject == "All" else selected_subject, None)
+    )
 
 # Define the metric columns
 col1, col2, col3, col4 = st.columns(4)
@@ -172,396 +267,186 @@ with col4:
     st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
     st.markdown(f"<div class='metric-value' style='color:{tier_color}'>{performance_tier}</div>", unsafe_allow_html=True)
     st.markdown(f"<div class='metric-label'>Performance Tier</div>", unsafe_allow_html=True)
+    if standing is not None and standing['size'] > 1:
+        st.markdown(f"<div class='metric-label'>Percentile {standing['percentile']:.0f} · Rank {standing['rank']} of {standing['size']}</div>", unsafe_allow_html=True)
     st.markdown("</div>", unsafe_allow_html=True)
 
-# Visualization section
-st.markdown("<h2 class='sub-header'>Performance Trends</h2>", unsafe_allow_html=True)
-
-# Prepare data for subject-wise comparison
-subject_comparison = filtered_df.groupby(['subject', 'date']).agg({
-    'percentage': 'mean',
-    '30_mark_scale': 'mean'
-}).reset_index()
-
-# Line chart for percentage trends over time
-fig1 = px.line(
-    subject_comparison, 
-    x='date', 
-    y='percentage', 
-    color='subject',
-    markers=True,
-    labels={'percentage': 'Percentage (%)', 'date': 'Date', 'subject': 'Subject'},
-    title='Performance Trend Over Time',
-    color_discrete_map={'Physics': '#3b82f6', 'Chemistry': '#10b981', 'Biology': '#f59e0b'}
+# Detail sections, one tab each below the metric cards. Only the selected
+# tab's sections are queried, computed and sent to the browser; the others
+# cost nothing until they are opened.
+trends_tab, questions_tab, recommendations_tab, recent_tab, insights_tab = st.tabs(
+    ["Performance Trends", "Question Analysis", "Study Focus Recommendations",
+     "Recent Test Analysis", "Quick Performance Insights"],
+    key="section", on_change="rerun",
 )
-fig1.update_layout(
-    height=400,
-    legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
-    xaxis_title="Date",
-    yaxis_title="Percentage (%)",
-    hovermode="x unified"
-)
-st.plotly_chart(fig1, use_container_width=True)
-
-# Create two columns for the next charts
-col1, col2 = st.columns(2)
-
-# Subject-wise comparison barplot
-with col1:
-    subject_avg = filtered_df.groupby('subject').agg({
-        'percentage': 'mean',
-        'accuracy_rate': 'mean',
-        'attempt_rate': 'mean',
-        'penalty_rate': 'mean'
-    }).reset_index()
-    
-    fig2 = px.bar(
-        subject_avg, 
-        x='subject', 
-        y='percentage',
-        color='subject',
-        labels={'percentage': 'Average Percentage (%)', 'subject': 'Subject'},
-        title='Subject-wise Performance Comparison',
-        color_discrete_map={'Physics': '#3b82f6', 'Chemistry': '#10b981', 'Biology': '#f59e0b'}
-    )
-    fig2.update_layout(
-        height=400,
-        xaxis_title="Subject",
-        yaxis_title="Average Percentage (%)"
-    )
-    st.plotly_chart(fig2, use_container_width=True)
-
-# Heatmap for metrics by subject
-with col2:
-    metrics_heatmap = pd.pivot_table(
-        subject_avg,
-        values=['accuracy_rate', 'attempt_rate', 'penalty_rate'],
-        index='subject'
-    ).reset_index()
-    
-    metrics_heatmap = metrics_heatmap.rename(columns={
-        'accuracy_rate': 'Accuracy',
-        'attempt_rate': 'Attempt Rate',
-        'penalty_rate': 'Penalty Rate'
-    })
-    
-    metrics_heatmap_long = pd.melt(
-        metrics_heatmap,
-        id_vars=['subject'],
-        value_vars=['Accuracy', 'Attempt Rate', 'Penalty Rate'],
-        var_name='Metric',
-        value_name='Rate'
-    )
-    
-    fig3 = px.density_heatmap(
-        metrics_heatmap_long,
-        x='Metric',
-        y='subject',
-        z='Rate',
-        color_continuous_scale='RdYlGn_r' if 'Penalty Rate' in metrics_heatmap_long['Metric'].unique() else 'RdYlGn',
-        labels={'Rate': 'Value (0-1)', 'subject': 'Subject', 'Metric': 'Metric'},
-        title='Key Performance Metrics by Subject'
-    )
-    fig3.update_layout(
-        height=400,
-        xaxis_title="Metric",
-        yaxis_title="Subject"
-    )
-    st.plotly_chart(fig3, use_container_width=True)
-
-# Question analysis section
-st.markdown("<h2 class='sub-header'>Question Analysis</h2>", unsafe_allow_html=True)
-
-col1, col2 = st.columns(2)
-
-# Question attempt distribution
-with col1:
-    question_dist = filtered_df.groupby('subject').agg({
-        'correct': 'sum',
-        'incorrect': 'sum',
-        'unattempted': 'sum'
-    }).reset_index()
-    
-    question_dist_long = pd.melt(
-        question_dist,
-        id_vars=['subject'],
-        value_vars=['correct', 'incorrect', 'unattempted'],
-        var_name='Status',
-        value_name='Count'
-    )
-    
-    fig4 = px.bar(
-        question_dist_long,
-        x='subject',
-        y='Count',
-        color='Status',
-        barmode='stack',
-        labels={'Count': 'Number of Questions', 'subject': 'Subject', 'Status': 'Question Status'},
-        title='Question Attempt Distribution by Subject',
-        color_discrete_map={'correct': '#10b981', 'incorrect': '#ef4444', 'unattempted': '#d1d5db'}
-    )
-    fig4.update_layout(
-        height=400,
-        xaxis_title="Subject",
-        yaxis_title="Number of Questions"
-    )
-    st.plotly_chart(fig4, use_container_width=True)
-
-# Performance gauge chart
-with col2:
-    overall_perf = filtered_df['percentage'].mean()
-    
-    fig5 = go.Figure(go.Indicator(
-        mode="gauge+number",
-        value=overall_perf,
-        domain={'x': [0, 1], 'y': [0, 1]},
-        title={'text': "Overall Performance", 'font': {'size': 24}},
-        gauge={
-            'axis': {'range': [0, 100], 'tickwidth': 1, 'tickcolor': "darkblue"},
-            'bar': {'color': tier_color},
-            'bgcolor': "white",
-            'borderwidth': 2,
-            'bordercolor': "gray",
-            'steps': [
-                {'range': [0, 40], 'color': '#fee2e2'},
-                {'range': [40, 60], 'color': '#fef3c7'},
-                {'range': [60, 75], 'color': '#d1fae5'},
-                {'range': [75, 90], 'color': '#a7f3d0'},
-                {'range': [90, 100], 'color': '#6ee7b7'}
-            ],
-            'threshold': {
-                'line': {'color': "red", 'width': 4},
-                'thickness': 0.75,
-                'value': 60
-            }
-        }
-    ))
-    fig5.update_layout(
-        height=400,
-        font={'color': "#1e3a8a", 'family': "Arial"}
-    )
-    st.plotly_chart(fig5, use_container_width=True)
-
-# Study focus recommendations
-st.markdown("<h2 class='sub-header'>Study Focus Recommendations</h2>", unsafe_allow_html=True)
-
-# Calculate weakest metrics
-subject_metrics = filtered_df.groupby('subject').agg({
-    'percentage': 'mean',
-    'accuracy_rate': 'mean',
-    'attempt_rate': 'mean',
-    'penalty_rate': 'mean'
-}).reset_index()
-
-weakest_subject = subject_metrics.loc[subject_metrics['percentage'].idxmin()]['subject']
-lowest_percentage = subject_metrics.loc[subject_metrics['percentage'].idxmin()]['percentage']
-lowest_accuracy_subject = subject_metrics.loc[subject_metrics['accuracy_rate'].idxmin()]['subject']
-lowest_accuracy = subject_metrics.loc[subject_metrics['accuracy_rate'].idxmin()]['accuracy_rate']
-lowest_attempt_subject = subject_metrics.loc[subject_metrics['attempt_rate'].idxmin()]['subject']
-lowest_attempt = subject_metrics.loc[subject_metrics['attempt_rate'].idxmin()]['attempt_rate']
-highest_penalty_subject = subject_metrics.loc[subject_metrics['penalty_rate'].idxmax()]['subject']
-highest_penalty = subject_metrics.loc[subject_metrics['penalty_rate'].idxmax()]['penalty_rate']
-
-col1, col2 = st.columns(2)
-
-with col1:
-    st.markdown("""
-    <div class='metric-card' style='height: 300px;'>
-        <h3 style='font-size: 1.3rem; color: #1e3a8a;'>Areas Needing Focus</h3>
-        <ul style='list-style-type: none; padding-left: 0;'>
-    """, unsafe_allow_html=True)
-    
-    if lowest_percentage < 75:
-        st.markdown(f"""
-            <li style='margin-bottom: 10px;'>
-                <span style='font-weight: bold; color: #ef4444;'>Overall Performance in {weakest_subject}:</span> 
-                {lowest_percentage:.2f}% - Focused study recommended
-            </li>
-        """, unsafe_allow_html=True)
-        
-    if lowest_accuracy < 0.75:
-        st.markdown(f"""
-            <li style='margin-bottom: 10px;'>
-                <span style='font-weight: bold; color: #ef4444;'>Accuracy in {lowest_accuracy_subject}:</span> 
-                {lowest_accuracy*100:.2f}% - Review core concepts
-            </li>
-        """, unsafe_allow_html=True)
-        
-    if lowest_attempt < 0.85:
-        st.markdown(f"""
-            <li style='margin-bottom: 10px;'>
-                <span style='font-weight: bold; color: #ef4444;'>Attempt Rate in {lowest_attempt_subject}:</span> 
-                {lowest_attempt*100:.2f}% - Practice more questions
-            </li>
-        """, unsafe_allow_html=True)
-        
-    if highest_penalty > 0.1:
-        st.markdown(f"""
-            <li style='margin-bottom: 10px;'>
-                <span style='font-weight: bold; color: #ef4444;'>High Penalty Rate in {highest_penalty_subject}:</span> 
-                {highest_penalty*100:.2f}% - Be more careful with answers
-            </li>
-        """, unsafe_allow_html=True)
-    
-    st.markdown("</ul></div>", unsafe_allow_html=True)
 
-with col2:
-    # Create recommendation based on data
-    st.markdown("""
-    <div class='metric-card' style='height: 300px;'>
-        <h3 style='font-size: 1.3rem; color: #1e3a8a;'>Study Recommendations</h3>
-        <ul style='list-style-type: none; padding-left: 0;'>
-    """, unsafe_allow_html=True)
-    
-    # General recommendations based on data
-    if weakest_subject == "Physics":
-        st.markdown("""
-            <li style='margin-bottom: 10px;'>
-                <span style='font-weight: bold; color: #3b82f6;'>Physics:</span> 
-                Focus on practicing numerical problems and conceptual understanding
-            </li>
-        """, unsafe_allow_html=True)
-    
-    if lowest_accuracy_subject == "Chemistry":
-        st.markdown("""
-            <li style='margin-bottom: 10px;'>
-                <span style='font-weight: bold; color: #10b981;'>Chemistry:</span> 
-                Review fundamental concepts and practice more problems
-            </li>
-        """, unsafe_allow_html=True)
-    
-    # Time management recommendation
-    if lowest_attempt < 0.9:
-        st.markdown("""
-            <li style='margin-bottom: 10px;'>
-                <span style='font-weight: bold; color: #f59e0b;'>Time Management:</span> 
-                Practice timed mock tests to improve question attempt rate
-            </li>
-        """, unsafe_allow_html=True)
-    
-    # Accuracy recommendation
-    if highest_penalty > 0.1:
-        st.markdown("""
-            <li style='margin-bottom: 10px;'>
-                <span style='font-weight: bold; color: #ef4444;'>Accuracy:</span> 
-                Take a more measured approach to answering questions - don't rush!
-            </li>
-        """, unsafe_allow_html=True)
-
-    st.markdown("</ul></div>", unsafe_allow_html=True)
-
-# Recent test analysis
-st.markdown("<h2 class='sub-header'>Recent Test Analysis</h2>", unsafe_allow_html=True)
-
-# Get the most recent test date
-recent_date = filtered_df['date'].max()
-recent_tests = filtered_df[filtered_df['date'] == recent_date]
-
-# Check if there are recent tests
-if not recent_tests.empty:
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        # Recent test metrics table
-        st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
-        st.markdown(f"<h3 style='font-size: 1.3rem; color: #1e3a8a;'>Tests on {recent_date.strftime('%d-%m-%Y')}</h3>", unsafe_allow_html=True)
-        
-        # Create a styled table
-        recent_table = recent_tests[['subject', 'percentage', 'accuracy_rate', 'attempt_rate']].copy()
-        recent_table['percentage'] = recent_table['percentage'].round(2)
-        recent_table['accuracy_rate'] = (recent_table['accuracy_rate'] * 100).round(2)
-        recent_table['attempt_rate'] = (recent_table['attempt_rate'] * 100).round(2)
-        
-        recent_table.columns = ['Subject', 'Percentage (%)', 'Accuracy (%)', 'Attempt (%)']
-        st.table(recent_table)
-        
-        st.markdown("</div>", unsafe_allow_html=True)
-    
-    with col2:
-        # Recent test radar chart
-        st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
-        
-        # Prepare data for radar chart
-        radar_data = recent_tests[['subject', 'accuracy_rate', 'attempt_rate', 'percentage']].copy()
-        
-        # Normalize percentage to 0-1 scale for radar chart
-        radar_data['percentage_norm'] = radar_data['percentage'] / 100
-        
-        # Convert to long format for radar chart
-        radar_data_long = pd.melt(
-            radar_data,
-            id_vars=['subject'],
-            value_vars=['accuracy_rate', 'attempt_rate', 'percentage_norm'],
-            var_name='Metric',
-            value_name='Value'
-        )
-        
-        # Rename metrics for display
-        radar_data_long['Metric'] = radar_data_long['Metric'].replace({
-            'accuracy_rate': 'Accuracy',
-            'attempt_rate': 'Attempt Rate',
-            'percentage_norm': 'Performance'
-        })
-        
-        # Create radar chart
-        fig6 = px.line_polar(
-            radar_data_long, 
-            r='Value', 
-            theta='Metric', 
-            color='subject', 
-            line_close=True,
-            range_r=[0, 1],
-            labels={'Value': 'Score (0-1)', 'Metric': 'Metric'},
-            title='Recent Test Performance Radar',
-            color_discrete_map={'Physics': '#3b82f6', 'Chemistry': '#10b981', 'Biology': '#f59e0b'}
+if trends_tab.open:
+    with trends_tab, profiling.section('tab.trends'):
+        trend_view = query_engine().section('trend', *filters)
+        subject_view = query_engine().section('subjects', *filters)
+        # Subject-level averages, shared by the comparison charts
+        subject_metrics = subject_view['subject_metrics']
+
+        # Line chart for percentage trends over time
+        # (served downsampled: weekly/monthly rollups and a bounded number of points)
+        fig1 = plot_chart('trend', figures.trend_figure, trend_view['trend_series'], trend_view['trend_resolution'])
+
+        # Create two columns for the next charts
+        col1, col2 = st.columns(2)
+
+        # Subject-wise comparison barplot
+        with col1:
+            subject_avg = subject_metrics
+
+            fig2 = plot_chart('subject_bar', figures.subject_bar_figure, subject_avg)
+
+        # Heatmap for metrics by subject
+        with col2:
+            fig3 = plot_chart('metrics_heatmap', figures.metrics_heatmap_figure, subject_avg)
+
+        # Per-subject trend: recent and longer-run averages, smoothed score and the
+        # fitted change per week over the selected range
+        subject_trends = subject_view['subject_trends']
+        if not subject_trends.empty:
+            trend_table = subject_trends.round(2)
+            trend_table.columns = ['Subject', '7-Day Avg (%)', '30-Day Avg (%)', 'Smoothed (%)', 'Change per Week']
+            st.dataframe(trend_table, hide_index=True, width="stretch")
+
+if questions_tab.open:
+    with questions_tab, profiling.section('tab.questions'):
+        col1, col2 = st.columns(2)
+
+        # Question attempt distribution
+        with col1:
+            question_dist = query_engine().section('subjects', *filters)['question_dist']
+
+            fig4 = plot_chart('question_distribution', figures.question_distribution_figure, question_dist)
+
+        # Performance gauge chart
+        with col2:
+            overall_perf = avg_percentage
+
+            fig5 = plot_chart('performance_gauge', figures.performance_gauge_figure, overall_perf, tier_color)
+
+if recommendations_tab.open:
+    with recommendations_tab, profiling.section('tab.recommendations'):
+        # The recommendation rule table, evaluated against the subject averages
+        recommendation_results = query_engine().section('recommendations', *filters)['recommendations']
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.markdown("""
+            <div class='metric-card' style='height: 300px;'>
+                <h3 style='font-size: 1.3rem; color: #1e3a8a;'>Areas Needing Focus</h3>
+                <ul style='list-style-type: none; padding-left: 0;'>
+            """, unsafe_allow_html=True)
+
+            for label, message, color in recommendations.messages(recommendation_results, 'focus'):
+                st.markdown(f"""
+                    <li style='margin-bottom: 10px;'>
+                        <span style='font-weight: bold; color: {color};'>{label}:</span> 
+                        {message}
+                    </li>
+                """, unsafe_allow_html=True)
+
+            st.markdown("</ul></div>", unsafe_allow_html=True)
+
+        with col2:
+            # Create recommendation based on data
+            st.markdown("""
+            <div class='metric-card' style='height: 300px;'>
+                <h3 style='font-size: 1.3rem; color: #1e3a8a;'>Study Recommendations</h3>
+                <ul style='list-style-type: none; padding-left: 0;'>
+            """, unsafe_allow_html=True)
+
+            for label, message, color in recommendations.messages(recommendation_results, 'study'):
+                st.markdown(f"""
+                    <li style='margin-bottom: 10px;'>
+                        <span style='font-weight: bold; color: {color};'>{label}:</span> 
+                        {message}
+                    </li>
+                """, unsafe_allow_html=True)
+
+            st.markdown("</ul></div>", unsafe_allow_html=True)
+
+# One test day's results: the most recent day of the selection by default,
+# or any earlier one picked on the slider. Each day's rows come straight from
+# the day index, and stepping through days reruns only this section.
+@st.fragment
+def test_day_section(data, start, end, subject, student, cohort_index):
+    with profiler().fragment('fragment.test_day', fragment_rerun()):
+        days = data.days.between(start, end, subject)
+        if not days:
+            return
+        test_day = days[-1]
+        if len(days) > 1:
+            test_day = st.select_slider(
+                "Test day", options=days, value=test_day, format_func=lambda day: day.strftime('%d-%m-%Y')
+            )
+        day_tests = data.days.rows(test_day, subject)
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            # Test metrics table
+            st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
+            st.markdown(f"<h3 style='font-size: 1.3rem; color: #1e3a8a;'>Tests on {test_day.strftime('%d-%m-%Y')}</h3>", unsafe_allow_html=True)
+
+            # Create a styled table
+            day_table = day_tests[['subject', 'percentage', 'accuracy_rate', 'attempt_rate']].copy()
+            # Widen the cached float32 columns so rounding displays cleanly
+            day_table['percentage'] = day_table['percentage'].astype('float64').round(2)
+            day_table['accuracy_rate'] = (day_table['accuracy_rate'].astype('float64') * 100).round(2)
+            day_table['attempt_rate'] = (day_table['attempt_rate'].astype('float64') * 100).round(2)
+
+            day_table.columns = ['Subject', 'Percentage (%)', 'Accuracy (%)', 'Attempt (%)']
+            # Where each of these scores placed among everyone tested that day
+            if cohort_index is not None and cohort_index.size((None, test_day)) > 1:
+                day_table['Cohort Percentile'] = [
+                    None if np.isnan(p) else round(p)
+                    for p in cohort_index.date_percentiles(student, test_day, day_table['Subject'].astype(str))
+                ]
+            st.table(day_table)
+
+            st.markdown("</div>", unsafe_allow_html=True)
+
+        with col2:
+            # Test day radar chart
+            st.markdown("<div class='metric-card'>", unsafe_allow_html=True)
+
+            plot_chart('recent_radar', figures.recent_radar_figure, day_tests)
+
+            st.markdown("</div>", unsafe_allow_html=True)
+
+if recent_tab.open:
+    with recent_tab, profiling.section('tab.recent'):
+        test_day_section(
+            data, start_date, end_date, None if selected_subject == "All" else selected_subject,
+            selected_student, cohort_index,
         )
-        fig6.update_layout(
-            polar=dict(
-                radialaxis=dict(
-                    visible=True,
-                    range=[0, 1]
-                )
-            ),
-            showlegend=True
-        )
-        st.plotly_chart(fig6, use_container_width=True)
-        
-        st.markdown("</div>", unsafe_allow_html=True)
-
-# Footer with performance insights
-st.markdown("<h2 class='sub-header'>Quick Performance Insights</h2>", unsafe_allow_html=True)
-
-# Calculate improvement metrics
-if len(filtered_df['date'].unique()) > 1:
-    first_date = filtered_df['date'].min()
-    last_date = filtered_df['date'].max()
-    
-    first_day = filtered_df[filtered_df['date'] == first_date]
-    last_day = filtered_df[filtered_df['date'] == last_date]
-    
-    first_day_avg = first_day['percentage'].mean()
-    last_day_avg = last_day['percentage'].mean()
-    
-    improvement = last_day_avg - first_day_avg
-    
-    if improvement > 5:
-        insight = f"🚀 Great improvement! Your average score increased by {improvement:.2f}% from {first_date.strftime('%d-%m-%Y')} to {last_date.strftime('%d-%m-%Y')}."
-    elif improvement < -5:
-        insight = f"📉 Note: Your average score decreased by {abs(improvement):.2f}% from {first_date.strftime('%d-%m-%Y')} to {last_date.strftime('%d-%m-%Y')}. Review your study approach."
-    else:
-        insight = f"📊 Your performance has been relatively stable (change of {improvement:.2f}%) from {first_date.strftime('%d-%m-%Y')} to {last_date.strftime('%d-%m-%Y')}."
-    
-    # Best and worst subjects
-    best_subject = subject_metrics.loc[subject_metrics['percentage'].idxmax()]
-    worst_subject = subject_metrics.loc[subject_metrics['percentage'].idxmin()]
-    
-    st.info(insight)
-    st.success(f"💪 Strongest Subject: {best_subject['subject']} with average score of {best_subject['percentage']:.2f}%")
-    
-    if worst_subject['percentage'] < 70:
-        st.warning(f"🔍 Focus Area: {worst_subject['subject']} with average score of {worst_subject['percentage']:.2f}%")
-    else:
-        st.info(f"👍 Your weakest subject is {worst_subject['subject']} with a still good average of {worst_subject['percentage']:.2f}%")
+
+if insights_tab.open:
+    with insights_tab, profiling.section('tab.insights'):
+        # Calculate improvement metrics
+        improvement_view = query_engine().section('improvement', *filters)
+        if improvement_view['improvement'] is not None:
+            first_date = improvement_view['improvement']['first_date']
+            last_date = improvement_view['improvement']['last_date']
+            improvement = improvement_view['improvement']['improvement']
+
+            if improvement > 5:
+                insight = f"🚀 Great improvement! Your average score increased by {improvement:.2f}% from {first_date.strftime('%d-%m-%Y')} to {last_date.strftime('%d-%m-%Y')}."
+            elif improvement < -5:
+                insight = f"📉 Note: Your average score decreased by {abs(improvement):.2f}% from {first_date.strftime('%d-%m-%Y')} to {last_date.strftime('%d-%m-%Y')}. Review your study approach."
+            else:
+                insight = f"📊 Your performance has been relatively stable (change of {improvement:.2f}%) from {first_date.strftime('%d-%m-%Y')} to {last_date.strftime('%d-%m-%Y')}."
+
+            st.info(insight)
+
+            # Best and worst subjects
+            recommendation_results = query_engine().section('recommendations', *filters)['recommendations']
+            for _, message, level in recommendations.messages(recommendation_results, 'insight'):
+                getattr(st, level)(message)
 
 # Help section in the sidebar
 st.sidebar.markdown("## Dashboard Help")
@@ -570,21 +455,105 @@ st.sidebar.markdown("""
 - Use the date range selector to view performance for specific periods
 - Select a subject to filter all charts and metrics for that subject only
 - Hover over charts for detailed information
-- Look for recommendations in the "Study Focus" section
+- Look for recommendations in the "Study Focus Recommendations" tab
 """)
 
 # Add a data download option
 st.sidebar.markdown("## Download Your Data")
-csv_export = filtered_df.to_csv(index=False).encode('utf-8')
+
+# Runs when the download is requested, outside any rerun
+def export_download(frame, export_format):
+    with profiler().measure('export'):
+        sink = export.export_file(frame, export_format)
+    profiler().add('export_bytes', os.fstat(sink.fileno()).st_size)
+    return sink
+
+export_format = st.sidebar.selectbox("Export Format", list(export.EXPORT_FORMATS))
+# The rows are only serialized (in chunks) when the button is actually clicked
 st.sidebar.download_button(
-    label="Download as CSV",
-    data=csv_export,
-    file_name="student_performance_data.csv",
-    mime="text/csv",
+    label=f"Download as {export_format}",
+    data=lambda: export_download(filtered_df, export_format),
+    file_name=export.file_name("student_performance_data", export_format),
+    mime=export.mime_type(export_format),
+    on_click="ignore",
 )
 
 # Add an expandable data table
-with st.expander("View Raw Data Table"):
-    st.dataframe(filtered_df.sort_values(by=['date', 'subject']), use_container_width=True)
-
-st.text("Made for Armaan Chautala 🎀")
\ No newline at end of file
+# Nothing is built while it is collapsed; when open, the (already date-sorted)
+# rows are narrowed by the table's own filters and only one page of them is
+# sliced out and sent. Filtering, paging, choosing columns or flipping the
+# order reruns just the table, not the page above it.
+@st.fragment
+def raw_table_page(frame):
+    with profiler().fragment('fragment.raw_table', fragment_rerun()):
+        col1, col2, col3 = st.columns([3, 1, 1])
+        with col1:
+            table_columns = st.multiselect("Columns", list(frame.columns), default=list(frame.columns))
+        with col2:
+            page_size = st.selectbox("Rows per page", [25, 50, 100, 250], index=1)
+        with col3:
+            newest_first = st.toggle("Newest first")
+
+        # Row filters, within the dates and subject selected in the sidebar
+        if not frame.empty:
+            col1, col2, col3 = st.columns([2, 2, 2])
+            with col1:
+                table_subjects = st.multiselect(
+                    "Subjects", list(frame['subject'].unique()), placeholder="All subjects"
+                )
+            with col2:
+                first_day, last_day = frame['date'].iloc[0].date(), frame['date'].iloc[-1].date()
+                table_dates = st.date_input(
+                    "Dates", value=(first_day, last_day), min_value=first_day, max_value=last_day
+                )
+            with col3:
+                value_column = st.selectbox(
+                    "Filter by value", [None] + list(frame.select_dtypes('number').columns),
+                    format_func=lambda column: "No value filter" if column is None else column,
+                )
+            low = high = None
+            if value_column is not None:
+                lowest, highest = float(frame[value_column].min()), float(frame[value_column].max())
+                if lowest < highest:
+                    low, high = st.slider(value_column, lowest, highest, (lowest, highest))
+                else:
+                    value_column = None
+            start, end = table_dates if len(table_dates) == 2 else (None, None)
+            frame = dataset.filter_rows(frame, table_subjects, start, end, value_column, low, high)
+
+        page_count = max(math.ceil(len(frame) / page_size), 1)
+        page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1)
+        st.dataframe(
+            dataset.page_rows(frame, page - 1, page_size, newest_first, table_columns),
+            width="stretch",
+        )
+        st.caption(f"Page {page} of {page_count} ({len(frame)} rows)")
+
+raw_table = st.expander("View Raw Data Table", key="raw_table", on_change="rerun")
+if raw_table.open:
+    with raw_table, profiling.section('raw_table'):
+        raw_table_page(filtered_df)
+
+st.text("Made for Armaan Chautala 🎀")
+
+# Performance panel: this rerun's section timings, and percentiles across all
+# sessions. Shown when profiling is enabled or the page is opened with ?profile
+profile_run.finish()
+if profiling.ENABLED or 'profile' in st.query_params:
+    with st.sidebar.expander("Performance"):
+        st.dataframe(profiler().summary().round(2), hide_index=True, width="stretch")
+        st.caption(f"{profiler().runs} rerun(s) recorded")
+        memory = dataset_registry().manifest['students'].get(selected_student, {}).get('memory')
+        if memory:
+            st.caption(
+                f"Compact schema: {memory['before_bytes'] / 1024:,.0f} KiB -> "
+                f"{memory['after_bytes'] / 1024:,.0f} KiB ({memory['saved_ratio']:.0%} saved)"
+            )
+        st.json({
+            'this_rerun': profile_run.counters,
+            'totals': profiler().counters(),
+            'dataset_bytes': dataset_registry().memory_usage(),
+            'views': query_engine().views.stats(),
+            'api_responses': query_engine().responses.stats(),
+            'figure_cache': figure_cache().stats(),
+        }, expanded=False)
@@ -0,0 +1,208 @@
+import argparse
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import plotly.io as pio
+
+import dataset
+import figures
+import metrics
+import recommendations
+import store
+
+# Headless batch reports.
+#
+# Computes the dashboard's metrics (the same metrics.build_view() the
+# Streamlit page uses) for many students and date windows without a Streamlit
+# server, one student per worker process, and writes the results as Parquet
+# and JSON tables, optionally with a static HTML report per student/window.
+#
+#     python batch.py --out reports --windows month --html
+
+
+class BatchError(ValueError):
+    pass
+
+
+# Calendar months of the data; with start/end, only the months they overlap,
+# the first and last of them cut to the range
+def month_windows(data, start=None, end=None):
+    if data.first_date is None:
+        return []
+    first = max(data.first_date.date(), start) if start else data.first_date.date()
+    last = min(data.last_date.date(), end) if end else data.last_date.date()
+    if first > last:
+        return []
+    windows = []
+    for month in pd.period_range(first, last, freq='M'):
+        window_start, window_end = month.start_time.date(), month.end_time.date()
+        windows.append((max(window_start, start) if start else window_start,
+                        min(window_end, end) if end else window_end))
+    return windows
+
+
+def windows_for(data, windows, start=None, end=None):
+    if windows == 'month':
+        return month_windows(data, start, end)
+    return [(start, end)]
+
+
+def _window_label(start, end):
+    return f"{start or 'start'}_{end or 'end'}"
+
+
+def write_html_report(view, path, title):
+    performance_tier, tier_color = view['performance_tier']
+    figs = [
+        figures.trend_figure(view['trend_series'], view['trend_resolution']),
+        figures.subject_bar_figure(view['subject_metrics']),
+        figures.metrics_heatmap_figure(view['subject_metrics']),
+        figures.question_distribution_figure(view['question_dist']),
+        figures.performance_gauge_figure(view['overall']['percentage'], tier_color),
+    ]
+    if not view['recent_tests'].empty:
+        figs.append(figures.recent_radar_figure(view['recent_tests']))
+
+    # plotly.js is inlined once so the report works offline
+    body = "\n".join(
+        pio.to_html(fig, full_html=False, include_plotlyjs=(i == 0))
+        for i, fig in enumerate(figs)
+    )
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"<html><head><meta charset='utf-8'><title>{title}</title></head>"
+                f"<body><h1>{title}</h1><p>Performance Tier: {performance_tier}</p>"
+                f"{body}</body></html>")
+
+
+# Reports for one student over every requested window (runs in a worker)
+def student_reports(student, windows, start, end, store_dir, html_dir):
+    data = dataset.Dataset(store.read_student(student, store_dir=store_dir))
+    summaries, subjects, recent, recs = [], [], [], []
+
+    for window_start, window_end in windows_for(data, windows, start, end):
+        view = metrics.build_view(data, window_start, window_end)
+        if view['filtered_df'].empty:
+            continue
+        keys = {'student': student, 'window_start': window_start, 'window_end': window_end}
+        overall = view['overall']
+        improvement = view['improvement']
+
+        summaries.append({
+            **keys,
+            'tests': int(view['filtered_cube']['date'].nunique()),
+            'avg_percentage': overall['percentage'],
+            'avg_accuracy': overall['accuracy_rate'] * 100,
+            'avg_attempt_rate': overall['attempt_rate'] * 100,
+            'avg_penalty_rate': overall['penalty_rate'] * 100,
+            'performance_tier': view['performance_tier'][0],
+            'percentage_trend': view['trends']['percentage'],
+            'accuracy_trend': view['trends']['accuracy_rate'],
+            'attempt_trend': view['trends']['attempt_rate'],
+            'improvement': None if improvement is None else improvement['improvement'],
+            'recent_date': view['recent_date'],
+        })
+        subject_trends = view['subject_trends'].astype({'subject': str})
+        subjects.append(view['subject_metrics'].astype({'subject': str})
+                        .merge(subject_trends, on='subject', how='left').assign(**keys))
+        recent.append(view['recent_tests'][['date', 'subject', 'percentage', 'accuracy_rate', 'attempt_rate']]
+                      .assign(**keys))
+        recs.append(recommendations.formatted(view['recommendations']).assign(**keys))
+
+        if html_dir:
+            label = _window_label(window_start, window_end)
+            write_html_report(view, os.path.join(html_dir, student, f"{label}.html"),
+                              f"{student}: {label}")
+
+    return summaries, subjects, recent, recs
+
+
+def _concat(frames):
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame()
+    table = pd.concat(frames, ignore_index=True)
+    # Subjects from different students carry different categories
+    if 'subject' in table.columns:
+        table['subject'] = table['subject'].astype(str)
+    return table
+
+
+def write_table(table, out_dir, name, formats):
+    if 'parquet' in formats:
+        table.to_parquet(os.path.join(out_dir, f"{name}.parquet"), index=False)
+    if 'json' in formats:
+        table.to_json(os.path.join(out_dir, f"{name}.json"), orient='records',
+                      date_format='iso', indent=2)
+
+
+def run(students=None, windows='all', start=None, end=None, out_dir='reports',
+        formats=('parquet', 'json'), html=False, workers=None,
+        data_dir=store.DATA_DIR, store_dir=store.STORE_DIR):
+    if start and end and start > end:
+        raise BatchError(f"start {start} is after end {end}")
+    manifest = store.ingest_directory(data_dir, store_dir)
+    # Checked here: a worker would only fail on the missing snapshot
+    unknown = sorted(set(students or []) - set(manifest['students']))
+    if unknown:
+        raise BatchError(f"unknown student(s): {', '.join(unknown)} "
+                         f"(known: {', '.join(sorted(manifest['students'])) or 'none'})")
+    students = students or sorted(manifest['students'])
+    html_dir = os.path.join(out_dir, 'html') if html else None
+    os.makedirs(out_dir, exist_ok=True)
+
+    summaries, subjects, recent, recs = [], [], [], []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(
+            functools.partial(student_reports, windows=windows, start=start, end=end,
+                              store_dir=store_dir, html_dir=html_dir),
+            students,
+        )
+        for student_summaries, student_subjects, student_recent, student_recs in results:
+            summaries += student_summaries
+            subjects += student_subjects
+            recent += student_recent
+            recs += student_recs
+
+    tables = {
+        'summary': pd.DataFrame(summaries),
+        'subjects': _concat(subjects),
+        'recent_tests': _concat(recent),
+        'recommendations': _concat(recs),
+    }
+    for name, table in tables.items():
+        write_table(table, out_dir, name, formats)
+    return tables
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate dashboard reports without Streamlit.")
+    parser.add_argument('--students', nargs='*', help="student ids (default: every student)")
+    parser.add_argument('--windows', choices=['all', 'month'], default='all',
+                        help="one report over the whole range, or one per calendar month "
+                             "(limited to --start/--end)")
+    parser.add_argument('--start', type=lambda s: pd.Timestamp(s).date(), help="window start (YYYY-MM-DD)")
+    parser.add_argument('--end', type=lambda s: pd.Timestamp(s).date(), help="window end (YYYY-MM-DD)")
+    parser.add_argument('--out', default='reports', help="output directory")
+    parser.add_argument('--format', nargs='+', choices=['parquet', 'json'], default=['parquet', 'json'])
+    parser.add_argument('--html', action='store_true', help="also write static HTML reports")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--data-dir', default=store.DATA_DIR)
+    parser.add_argument('--store-dir', default=store.STORE_DIR)
+    args = parser.parse_args(argv)
+
+    try:
+        tables = run(
+            students=args.students, windows=args.windows, start=args.start, end=args.end,
+            out_dir=args.out, formats=args.format, html=args.html, workers=args.workers,
+            data_dir=args.data_dir, store_dir=args.store_dir,
+        )
+    except BatchError as error:
+        parser.error(str(error))
+    print(f"Wrote {len(tables['summary'])} report(s) to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+import aggregates
+import dataset
+import downsample
+import export
+import figures
+import ingest
+import metrics
+import recommendations
+import store
+import synthetic
+
+# Benchmarks for the dashboard's rerun path, without a browser.
+#
+# For each dataset size a synthetic student is written to a scratch store and
+# the same steps a rerun performs are timed one by one: loading the student,
+# filtering, every aggregation, each figure build and its JSON serialization,
+# the recommendations and the CSV export. Results can be saved as a baseline
+# and later runs compared against it; the exit status is non-zero when a step
+# got slower than the allowed tolerance.
+#
+#     python benchmark.py --sizes 1e3 1e4 1e5 --save benchmarks/baseline.json
+#     python benchmark.py --sizes 1e3 1e4 1e5 --compare benchmarks/baseline.json
+
+DEFAULT_SIZES = [1e3, 1e4, 1e5, 1e6]
+DEFAULT_REPEAT = 5
+# Workbooks above this many rows are not generated (openpyxl is too slow)
+XLSX_MAX_ROWS = 10_000
+# A step regresses when its fastest run, corrected for the speed of the
+# machine at the time, is this much slower than the baseline's fastest plus
+# the baseline's own spread (median - min) ...
+DEFAULT_TOLERANCE = 1.5
+# ... and by more than this many milliseconds (timer noise on tiny steps)
+NOISE_FLOOR_MS = 1.0
+# Fixed workload timed next to every sample (sorting this many floats)
+CALIBRATION_SIZE = 200_000
+
+_calibration_values = np.random.default_rng(0).random(CALIBRATION_SIZE)
+
+
+def _elapsed_ms(function):
+    start = time.perf_counter()
+    function()
+    return (time.perf_counter() - start) * 1000
+
+
+# Shared machines speed up and slow down by half or more over a run, for
+# seconds at a time. The calibration workload is timed right before each
+# sample, so its (median) time says how fast the machine was while the step
+# ran.
+def time_call(function, repeat=DEFAULT_REPEAT):
+    samples, calibration = [], []
+    for _ in range(repeat):
+        calibration.append(_elapsed_ms(lambda: np.sort(_calibration_values)))
+        samples.append(_elapsed_ms(function))
+    return {
+        'median_ms': statistics.median(samples),
+        'min_ms': min(samples),
+        'calibration_ms': statistics.median(calibration),
+    }
+
+
+# Steps of one rerun, as (name, callable), for a loaded student
+def rerun_steps(data):
+    start = data.last_date - pd.Timedelta(days=30)
+    view = metrics.build_view(data)
+    cube = view['filtered_cube']
+    frame = view['filtered_df']
+    trend_series, trend_resolution = view['trend_series'], view['trend_resolution']
+    subject_metrics = view['subject_metrics']
+    performance_tier, tier_color = view['performance_tier']
+
+    builds = {
+        'trend': lambda: figures.trend_figure(trend_series, trend_resolution),
+        'subject_bar': lambda: figures.subject_bar_figure(subject_metrics),
+        'metrics_heatmap': lambda: figures.metrics_heatmap_figure(subject_metrics),
+        'question_distribution': lambda: figures.question_distribution_figure(view['question_dist']),
+        'performance_gauge': lambda: figures.performance_gauge_figure(view['overall']['percentage'], tier_color),
+        'recent_radar': lambda: figures.recent_radar_figure(view['recent_tests']),
+    }
+
+    steps = [
+        ('filter.all', lambda: data.select()),
+        ('filter.last_30_days', lambda: data.select(start, None)),
+        ('filter.subject', lambda: data.select(None, None, synthetic.SUBJECTS[0])),
+        ('aggregate.overall_means', lambda: aggregates.overall_means(cube)),
+        ('trend.momentum', lambda: data.trends.momentum(start)),
+        ('trend.subject_summary', lambda: data.trends.subject_summary(start)),
+        ('aggregate.subject_date_means', lambda: aggregates.subject_date_means(cube, ['percentage', '30_mark_scale'])),
+        ('aggregate.subject_means', lambda: aggregates.subject_means(cube, metrics.SUBJECT_METRIC_COLUMNS)),
+        ('aggregate.subject_sums', lambda: aggregates.subject_sums(cube, ['correct', 'incorrect', 'unattempted'])),
+        # Answered from the day index, not by scanning the cube
+        ('day.recent_tests', lambda: metrics.recent_tests(data, start)),
+        ('day.first_last_improvement', lambda: metrics.first_last_improvement(data, start)),
+        ('aggregate.trend_series', lambda: downsample.trend_series(cube)),
+        ('view.build', lambda: metrics.build_view(data)),
+    ]
+    for name in metrics.SECTIONS:
+        steps.append((f'view.{name}', lambda name=name: metrics.build_section(name, data)))
+    for name, build in builds.items():
+        figure = build()
+        steps.append((f'figure.{name}', build))
+        steps.append((f'figure.{name}.to_json', lambda figure=figure: pio.to_json(figure, validate=False)))
+    steps.append(('recommendations.evaluate', lambda: recommendations.evaluate(subject_metrics)))
+    steps.append(('export.csv', lambda: export.export_file(frame, 'CSV').close()))
+    return steps
+
+
+def bench_size(rows, scratch_dir, repeat=DEFAULT_REPEAT, seed=0):
+    store_dir = os.path.join(scratch_dir, 'store')
+    student = synthetic.populate_store(store_dir, 1, rows, seed=seed)[0]
+    results = {}
+
+    if rows <= XLSX_MAX_ROWS:
+        workbook = os.path.join(scratch_dir, f"{student}.xlsx")
+        synthetic.write_workbook(store.read_student(student, store_dir=store_dir), workbook)
+        results['load.parse_xlsx'] = time_call(lambda: ingest.validate(ingest.read_source(workbook), workbook), repeat)
+
+    results['load.read_store'] = time_call(lambda: store.read_student(student, store_dir=store_dir), repeat)
+    frame = store.read_student(student, store_dir=store_dir)
+    results['load.dataset'] = time_call(lambda: dataset.Dataset(frame), repeat)
+
+    for name, step in rerun_steps(dataset.Dataset(frame)):
+        results[name] = time_call(step, repeat)
+    return results
+
+
+# Loading every student of a multi-student store, one after another
+def bench_students(students, rows_per_student, scratch_dir, repeat=DEFAULT_REPEAT, seed=0):
+    store_dir = os.path.join(scratch_dir, 'students')
+    ids = synthetic.populate_store(store_dir, students, rows_per_student, seed=seed)
+    load_all = lambda: [dataset.Dataset(store.read_student(s, store_dir=store_dir)) for s in ids]
+    return {'load.all_students': time_call(load_all, repeat)}
+
+
+def run(sizes=DEFAULT_SIZES, students=0, student_rows=1e4, repeat=DEFAULT_REPEAT, seed=0):
+    results = {}
+    scratch_dir = tempfile.mkdtemp(prefix='dashboard-bench-')
+    try:
+        for rows in sizes:
+            rows = int(rows)
+            for name, timing in bench_size(rows, scratch_dir, repeat, seed).items():
+                results[f"rows={rows}/{name}"] = timing
+            shutil.rmtree(os.path.join(scratch_dir, 'store'), ignore_errors=True)
+        if students:
+            timings = bench_students(students, int(student_rows), scratch_dir, repeat, seed)
+            for name, timing in timings.items():
+                results[f"students={students}x{int(student_rows)}/{name}"] = timing
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'repeat': repeat,
+            'seed': seed,
+        },
+        'results': results,
+    }
+
+
+# Steps slower than the baseline: (name, baseline ms, current ms). The
+# fastest of the repeats is compared, since load on the machine only ever
+# adds time, and it is scaled to the baseline machine's speed using the
+# calibration times (baselines recorded without them are compared as is).
+def regressions(report, baseline, tolerance=DEFAULT_TOLERANCE, noise_floor_ms=NOISE_FLOOR_MS):
+    slower = []
+    for name, timing in report['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        current, previous = timing['min_ms'], before['min_ms']
+        if 'calibration_ms' in timing and 'calibration_ms' in before:
+            current *= before['calibration_ms'] / timing['calibration_ms']
+        spread = before['median_ms'] - previous
+        if current > previous * tolerance + spread and current - previous > noise_floor_ms:
+            slower.append((name, previous, current))
+    return slower
+
+
+def print_report(report, baseline=None):
+    for name, timing in report['results'].items():
+        line = f"{name:<60} {timing['median_ms']:>10.2f} ms"
+        before = baseline and baseline['results'].get(name)
+        if before:
+            line += f"  ({timing['median_ms'] / max(before['median_ms'], 1e-9):.2f}x baseline)"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the dashboard's rerun steps on synthetic data.")
+    parser.add_argument('--sizes', nargs='+', type=float, default=DEFAULT_SIZES,
+                        help="rows per dataset (e.g. 1e3 1e5 1e7)")
+    parser.add_argument('--students', type=int, default=0,
+                        help="also time loading this many students")
+    parser.add_argument('--student-rows', type=float, default=1e4, help="rows per student for --students")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="baseline JSON file to compare against")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown factor before a step counts as a regression")
+    args = parser.parse_args(argv)
+
+    report = run(args.sizes, args.students, args.student_rows, args.repeat, args.seed)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or '.', exist_ok=True)
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if baseline:
+        slower = regressions(report, baseline, args.tolerance)
+        for name, previous, current in slower:
+            print(f"REGRESSION {name}: {previous:.2f} ms -> {current:.2f} ms")
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,180 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Where a student stands in the cohort.
+#
+# Every student contributes one score per key: their mean percentage per
+# subject on each test date, over all subjects on each date, and the same two
+# over their whole history. For each key the cohort's scores are kept in one
+# sorted array, so a percentile or rank is two binary searches no matter how
+# many students there are. A refreshed student's old scores are taken out of
+# the arrays and the new ones inserted in place; nothing else is rebuilt.
+#
+# Keys are (subject, date) tuples where None means "all subjects" or "whole
+# history", e.g. ('Physics', None) or (None, Timestamp('2025-05-27')).
+
+ALL = None
+
+
+# One row per (student,) subject, date and score; subject None and date NaT
+# stand for "all subjects" and "whole history"
+def _score_frame(cube, metric, by=()):
+    by = list(by)
+    cube = cube.assign(subject=cube['subject'].astype(str))
+    cells = cube[by + ['subject', 'date']].assign(score=cube[metric] / cube['n'])
+
+    by_subject = cube.groupby(by + ['subject'])[['n', metric]].sum().reset_index()
+    by_date = cube.groupby(by + ['date'])[['n', metric]].sum().reset_index()
+    if by:
+        overall = cube.groupby(by)[['n', metric]].sum().reset_index()
+    else:
+        overall = pd.DataFrame({'n': [cube['n'].sum()], metric: [cube[metric].sum()]})
+
+    return pd.concat([
+        cells,
+        by_subject[by + ['subject']].assign(date=pd.NaT, score=by_subject[metric] / by_subject['n']),
+        by_date[by + ['date']].assign(subject=None, score=by_date[metric] / by_date['n']),
+        overall[by].assign(subject=None, date=pd.NaT, score=overall[metric] / overall['n']),
+    ], ignore_index=True)
+
+
+def _key(subject, date):
+    return (ALL if pd.isna(subject) else subject, ALL if pd.isna(date) else pd.Timestamp(date))
+
+
+# {key: score} for one student, from their aggregate cube
+def student_scores(cube, metric='percentage'):
+    if cube.empty:
+        return {}
+    frame = _score_frame(cube, metric)
+    return {
+        _key(subject, date): score
+        for subject, date, score in zip(frame['subject'], frame['date'], frame['score'])
+    }
+
+
+class CohortIndex:
+    def __init__(self):
+        self._key_ids = {}
+        self._sorted = []
+        # student -> (key ids ascending, scores)
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    # Build from {student: cube} with one grouping and one sort over everyone
+    @classmethod
+    def from_cubes(cls, cubes, metric='percentage'):
+        index = cls()
+        cubes = {student: cube for student, cube in cubes.items() if not cube.empty}
+        if not cubes:
+            return index
+
+        combined = pd.concat(list(cubes.values()), keys=list(cubes), names=['student', None])
+        frame = _score_frame(combined.reset_index(level='student'), metric, by=['student'])
+        # Key ids from the (subject, date) codes; -1 codes mean "all"
+        subject_codes, subjects = pd.factorize(frame['subject'])
+        date_codes, dates = pd.factorize(frame['date'])
+        key_codes = (subject_codes + 1) * (len(dates) + 1) + (date_codes + 1)
+        unique_keys, key_ids = np.unique(key_codes, return_inverse=True)
+        for code in unique_keys:
+            subject_code, date_code = divmod(int(code), len(dates) + 1)
+            index._key_id((subjects[subject_code - 1] if subject_code else ALL,
+                           dates[date_code - 1] if date_code else ALL))
+
+        student_codes, students = pd.factorize(frame['student'])
+        values = frame['score'].to_numpy(dtype='float64')
+        # Per key: scores ascending; per student: key ids ascending
+        order = np.lexsort((values, key_ids))
+        by_key = values[order]
+        bounds = np.searchsorted(key_ids[order], np.arange(len(unique_keys) + 1))
+        index._sorted = [by_key[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:])]
+        order = np.lexsort((key_ids, student_codes))
+        bounds = np.searchsorted(student_codes[order], np.arange(len(students) + 1))
+        for student, lo, hi in zip(students, bounds[:-1], bounds[1:]):
+            rows = order[lo:hi]
+            index._entries[student] = (key_ids[rows].astype(np.int64), values[rows])
+        return index
+
+    def _entry(self, scores):
+        ids = np.array([self._key_id(key) for key in scores], dtype=np.int64)
+        values = np.fromiter(scores.values(), dtype='float64', count=len(scores))
+        order = np.argsort(ids)
+        return ids[order], values[order]
+
+    def _key_id(self, key):
+        key_id = self._key_ids.get(key)
+        if key_id is None:
+            key_id = self._key_ids[key] = len(self._key_ids)
+            self._sorted.append(np.empty(0))
+        return key_id
+
+    def _remove(self, student):
+        entry = self._entries.pop(student, None)
+        if entry is None:
+            return
+        for key_id, value in zip(*entry):
+            values = self._sorted[key_id]
+            self._sorted[key_id] = np.delete(values, values.searchsorted(value))
+
+    # Replace one student's scores (e.g. after new results were ingested)
+    def update(self, student, cube, metric='percentage'):
+        scores = student_scores(cube, metric)
+        with self._lock:
+            self._remove(student)
+            ids, values = self._entry(scores)
+            for key_id, value in zip(ids, values):
+                sorted_values = self._sorted[key_id]
+                self._sorted[key_id] = np.insert(sorted_values, sorted_values.searchsorted(value), value)
+            self._entries[student] = (ids, values)
+
+    def remove(self, student):
+        with self._lock:
+            self._remove(student)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def size(self, key):
+        key_id = self._key_ids.get(key)
+        return 0 if key_id is None else len(self._sorted[key_id])
+
+    # Standing of `score` among the cohort's scores for `key`: mid-rank
+    # percentile (0-100), rank (1 = best) and cohort size, or None
+    def standing(self, key, score):
+        key_id = self._key_ids.get(key)
+        if key_id is None or np.isnan(score):
+            return None
+        values = self._sorted[key_id]
+        if len(values) == 0:
+            return None
+        below = values.searchsorted(score, side='left')
+        at_or_below = values.searchsorted(score, side='right')
+        return {
+            'percentile': (below + at_or_below) / 2 / len(values) * 100,
+            'rank': len(values) - at_or_below + 1,
+            'size': len(values),
+        }
+
+    # Standing of a student's own score for `key`
+    def student_standing(self, student, key):
+        with self._lock:
+            entry = self._entries.get(student)
+            key_id = self._key_ids.get(key)
+        if entry is None or key_id is None:
+            return None
+        ids, values = entry
+        position = ids.searchsorted(key_id)
+        if position == len(ids) or ids[position] != key_id:
+            return None
+        return self.standing(key, values[position])
+
+    # Percentile of a student on each of `subjects` for one test date
+    def date_percentiles(self, student, date, subjects):
+        date = pd.Timestamp(date)
+        percentiles = []
+        for subject in subjects:
+            standing = self.student_standing(student, (subject, date))
+            percentiles.append(np.nan if standing is None else standing['percentile'])
+        return percentiles
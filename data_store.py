@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+
+import pyarrow as pa
+
+import ingest
+import schema
+
+# Columnar cache for the source exports.
+#
+# Parsing an .xlsx through openpyxl dominates cold-start time, so each export
+# is read and validated once (see ingest.py) and its rows converted into an
+# Arrow IPC file under CACHE_DIR, with the rejected rows, if any, in a
+# `.rejected.arrow` file next to it. The cache remembers the mtime, size and
+# sha256 of the export it was built from and is only rebuilt when the export
+# actually changes, along with how much memory the compact schema saved on
+# its rows (see memory_report_for). Later loads memory-map the file.
+
+CACHE_DIR = ".cache"
+CACHE_VERSION = "3"
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_path_for(source_path, cache_dir=CACHE_DIR):
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    # Same-named exports from different folders must not share a cache file
+    path_digest = hashlib.sha1(os.path.abspath(source_path).encode('utf-8')).hexdigest()[:8]
+    return os.path.join(cache_dir, f"{stem}-{path_digest}.arrow")
+
+
+def rejected_path_for(cache_path):
+    return f"{os.path.splitext(cache_path)[0]}.rejected.arrow"
+
+
+def source_key(source_path, sha256=None):
+    stat = os.stat(source_path)
+    return {
+        'cache_version': CACHE_VERSION,
+        'source_mtime_ns': str(stat.st_mtime_ns),
+        'source_size': str(stat.st_size),
+        'source_sha256': sha256 or file_sha256(source_path),
+    }
+
+
+def _read_cache_key(cache_path):
+    try:
+        with pa.memory_map(cache_path) as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return None
+    raw = metadata.get(b'student_dashboard')
+    return json.loads(raw) if raw else None
+
+
+# Whether a key recorded by source_key() still describes the file on disk
+def key_matches(source_path, cached):
+    if cached is None or cached.get('cache_version') != CACHE_VERSION:
+        return False
+    if not os.path.exists(source_path):
+        return False
+    stat = os.stat(source_path)
+    if (cached.get('source_mtime_ns') == str(stat.st_mtime_ns)
+            and cached.get('source_size') == str(stat.st_size)):
+        return True
+    # The mtime moved (copy, checkout, touch); only the content decides
+    return cached.get('source_sha256') == file_sha256(source_path)
+
+
+def _cache_is_fresh(source_path, cache_path):
+    return key_matches(source_path, _read_cache_key(cache_path))
+
+
+# schema.memory_report() of an export's rows as of its last parse, or None
+def memory_report_for(source_path, cache_dir=CACHE_DIR):
+    cached = _read_cache_key(cache_path_for(source_path, cache_dir))
+    return cached.get('memory') if cached else None
+
+
+def write_cache(df, cache_path, key):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[b'student_dashboard'] = json.dumps(key).encode('utf-8')
+    table = table.replace_schema_metadata(metadata)
+
+    os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    # Atomic swap so concurrent readers never see a half-written file
+    os.replace(tmp_path, cache_path)
+
+
+def read_table(cache_path):
+    with pa.memory_map(cache_path) as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def read_cache(cache_path):
+    return read_table(cache_path).to_pandas()
+
+
+# (rows, rejected rows) of one export
+def load_dataset(source_path, cache_dir=CACHE_DIR):
+    cache_path = cache_path_for(source_path, cache_dir)
+    rejected_path = rejected_path_for(cache_path)
+    if os.path.exists(cache_path) and _cache_is_fresh(source_path, cache_path):
+        if os.path.exists(rejected_path):
+            return read_cache(cache_path), read_cache(rejected_path)
+        return read_cache(cache_path), ingest.empty_rejected()
+
+    key = source_key(source_path)
+    rows, rejected = ingest.validate(ingest.read_source(source_path), source_path)
+    df, report = schema.normalize_with_report(rows, source_path)
+    # The rejected rows go first: a fresh cache file always has current ones
+    if rejected.empty:
+        if os.path.exists(rejected_path):
+            os.remove(rejected_path)
+    else:
+        write_cache(rejected, rejected_path, key)
+    write_cache(df, cache_path, {**key, 'memory': report})
+    return df, rejected
@@ -0,0 +1,271 @@
+import numpy as np
+import pandas as pd
+
+import aggregates
+import trends
+
+# In-memory dataset the dashboard filters on every rerun.
+#
+# Rows are kept sorted by date so a date range is a contiguous slice found by
+# binary search on the datetime64 values, and each subject keeps the sorted
+# positions of its rows as a secondary index. Filtering therefore costs
+# O(log n) plus the size of the result instead of several full-column passes.
+#
+# DayIndex additionally maps every test day to its row range in the frame and
+# its cell range in the cube, with each day's overall sums precomputed, so
+# one day's tests or means (the recent-test table, first-vs-last comparisons,
+# browsing past days) are fetched directly instead of scanning for the date.
+#
+# When a student gains new test days, Dataset.extend() builds the new
+# dataset from the old one: only the new rows are aggregated, and the cube,
+# the indexes and the trend prefix sums are extended rather than rebuilt.
+
+
+class DateIndex:
+    # `frame` must already be sorted by date
+    def __init__(self, frame):
+        self.frame = frame
+        self.dates = frame['date'].to_numpy()
+        self.subject_rows = {
+            subject: np.asarray(rows)
+            for subject, rows in frame.groupby('subject', observed=True).indices.items()
+        }
+        self.subject_dates = {
+            subject: self.dates[rows] for subject, rows in self.subject_rows.items()
+        }
+
+    # Index over `frame`, which is this index's frame followed by newer rows
+    def extend(self, frame):
+        index = DateIndex.__new__(DateIndex)
+        index.frame = frame
+        index.dates = frame['date'].to_numpy()
+        index.subject_rows = dict(self.subject_rows)
+        index.subject_dates = dict(self.subject_dates)
+        offset = len(self.frame)
+        added = frame.iloc[offset:].groupby('subject', observed=True).indices
+        for subject, rows in added.items():
+            rows = np.asarray(rows) + offset
+            index.subject_rows[subject] = np.concatenate([self.subject_rows.get(subject, rows[:0]), rows])
+            index.subject_dates[subject] = np.concatenate(
+                [self.subject_dates.get(subject, index.dates[:0]), index.dates[rows]])
+        return index
+
+    # Half-open [lo, hi) bounds of the rows whose day lies in [start, end]
+    @staticmethod
+    def _bounds(dates, start, end):
+        lo = 0
+        hi = len(dates)
+        if start is not None:
+            lo = dates.searchsorted(pd.Timestamp(start).to_datetime64(), side='left')
+        if end is not None:
+            day_after = pd.Timestamp(end).normalize() + pd.Timedelta(days=1)
+            hi = dates.searchsorted(day_after.to_datetime64(), side='left')
+        return lo, hi
+
+    def select(self, start=None, end=None, subject=None):
+        if subject is None:
+            lo, hi = self._bounds(self.dates, start, end)
+            return self.frame.iloc[lo:hi]
+
+        rows = self.subject_rows.get(subject)
+        if rows is None:
+            return self.frame.iloc[0:0]
+        lo, hi = self._bounds(self.subject_dates[subject], start, end)
+        return self.frame.take(rows[lo:hi])
+
+
+class DayIndex:
+    SUM_COLUMNS = ['n'] + aggregates.MEAN_COLUMNS
+
+    # `frame` and `cube` must already be sorted by date
+    def __init__(self, frame, cube):
+        self.frame = frame
+        self.cube = cube
+        self.days, self.row_starts, self.cell_starts, self.subject_days, self.day_sums = self._index(
+            frame, cube)
+
+    # (days, row starts, cell starts, subject days, day sums) of `frame`/`cube`
+    @classmethod
+    def _index(cls, frame, cube):
+        cell_dates = cube['date'].to_numpy()
+        days = np.unique(cell_dates)
+        # Day i is frame rows [row_starts[i], row_starts[i + 1]) and cube
+        # cells [cell_starts[i], cell_starts[i + 1])
+        row_starts = np.append(frame['date'].to_numpy().searchsorted(days, side='left'), len(frame))
+        cell_starts = np.append(cell_dates.searchsorted(days, side='left'), len(cube))
+        subject_days = {
+            subject: cell_dates[rows]
+            for subject, rows in cube.groupby('subject', observed=True).indices.items()
+        }
+        sums = cube[cls.SUM_COLUMNS].to_numpy(dtype='float64')
+        day_sums = (np.add.reduceat(sums, cell_starts[:-1], axis=0)
+                    if len(days) else np.empty((0, len(cls.SUM_COLUMNS))))
+        return days, row_starts, cell_starts, subject_days, day_sums
+
+    # Index over `frame` and `cube`, which extend this index's frame and cube
+    # with rows and cells of later days
+    def extend(self, frame, cube):
+        row_offset, cell_offset = len(self.frame), len(self.cube)
+        days, row_starts, cell_starts, subject_days, day_sums = self._index(
+            frame.iloc[row_offset:], cube.iloc[cell_offset:])
+        index = DayIndex.__new__(DayIndex)
+        index.frame = frame
+        index.cube = cube
+        index.days = np.concatenate([self.days, days])
+        index.row_starts = np.concatenate([self.row_starts[:-1], row_starts + row_offset])
+        index.cell_starts = np.concatenate([self.cell_starts[:-1], cell_starts + cell_offset])
+        index.subject_days = dict(self.subject_days)
+        for subject, added in subject_days.items():
+            index.subject_days[subject] = np.concatenate([self.subject_days.get(subject, added[:0]), added])
+        index.day_sums = np.concatenate([self.day_sums, day_sums])
+        return index
+
+    def _days(self, subject):
+        if subject is None:
+            return self.days
+        return self.subject_days.get(subject, self.days[:0])
+
+    # Test days in [start, end], ascending
+    def between(self, start=None, end=None, subject=None):
+        days = self._days(subject)
+        lo, hi = DateIndex._bounds(days, start, end)
+        return [pd.Timestamp(day) for day in days[lo:hi]]
+
+    def first(self, start=None, end=None, subject=None):
+        days = self._days(subject)
+        lo, hi = DateIndex._bounds(days, start, end)
+        return pd.Timestamp(days[lo]) if hi > lo else None
+
+    def last(self, start=None, end=None, subject=None):
+        days = self._days(subject)
+        lo, hi = DateIndex._bounds(days, start, end)
+        return pd.Timestamp(days[hi - 1]) if hi > lo else None
+
+    # Position of `day` in days, or None when no test was taken that day
+    def _position(self, day):
+        day = pd.Timestamp(day).to_datetime64()
+        position = self.days.searchsorted(day)
+        if position == len(self.days) or self.days[position] != day:
+            return None
+        return position
+
+    # Rows of the tests taken on `day`
+    def rows(self, day, subject=None):
+        position = self._position(day)
+        if position is None:
+            return self.frame.iloc[0:0]
+        rows = self.frame.iloc[self.row_starts[position]:self.row_starts[position + 1]]
+        return rows if subject is None else rows[rows['subject'] == subject]
+
+    # Cube cells (per-subject sums) of `day`
+    def cells(self, day, subject=None):
+        position = self._position(day)
+        if position is None:
+            return self.cube.iloc[0:0]
+        cells = self.cube.iloc[self.cell_starts[position]:self.cell_starts[position + 1]]
+        return cells if subject is None else cells[cells['subject'] == subject]
+
+    # Mean of each column over the tests of `day`
+    def means(self, day, subject=None):
+        if subject is not None:
+            return aggregates.overall_means(self.cells(day, subject))
+        position = self._position(day)
+        if position is None:
+            return pd.Series(np.nan, index=aggregates.MEAN_COLUMNS)
+        sums = self.day_sums[position]
+        return pd.Series(sums[1:] / sums[0], index=aggregates.MEAN_COLUMNS)
+
+
+class Dataset:
+    def __init__(self, df):
+        if df['date'].is_monotonic_increasing:
+            # Already sorted (e.g. a store snapshot): keep the columns as they
+            # are, so memory-mapped data stays shared instead of copied
+            frame = df.reset_index(drop=True)
+        else:
+            # A stable sort keeps the workbook's subject order within each day
+            frame = df.sort_values('date', kind='stable', ignore_index=True)
+        self.frame = frame
+        self.cube = aggregates.build_cube(frame)
+        self.rows = DateIndex(self.frame)
+        self.cells = DateIndex(self.cube)
+        self.days = DayIndex(self.frame, self.cube)
+        # Prefix sums for O(1) window means, rolling means and slopes
+        self.trends = trends.TrendIndex(self.cube)
+        self._finish(_hash_sum(self.cube))
+
+    def _finish(self, cube_hash):
+        self.first_date = self.frame['date'].iloc[0] if len(self.frame) else None
+        self.last_date = self.frame['date'].iloc[-1] if len(self.frame) else None
+        # Content token for cache keys: changes whenever any aggregate changes.
+        # The row hashes are summed, so appended cells just add theirs.
+        self._cube_hash = cube_hash
+        self.version = format(cube_hash & 0xFFFFFFFFFFFF, 'x')
+
+    # Dataset over `frame` (e.g. the student's new snapshot), which holds this
+    # dataset's rows followed by rows of later days. Only the new rows are
+    # aggregated and indexed. Earlier rows are not compared, that would cost
+    # as much as a full build: callers only pass frames that continue this
+    # dataset's rows (the store checked the history's content hash, see
+    # registry.py). Anything else that does not line up (the last stored day,
+    # rows not strictly later, a new subject) falls back to a full build.
+    def extend(self, frame):
+        count = len(self.frame)
+        if (
+            count == 0
+            or len(frame) < count
+            or not frame['date'].is_monotonic_increasing
+            or frame['date'].iloc[count - 1] != self.last_date
+            or (count < len(frame) and frame['date'].iloc[count] <= self.last_date)
+            or list(frame['subject'].cat.categories) != list(self.cube['subject'].cat.categories)
+        ):
+            return Dataset(frame)
+        frame = frame.reset_index(drop=True)
+        cells = aggregates.build_cube(frame.iloc[count:])
+
+        updated = Dataset.__new__(Dataset)
+        updated.frame = frame
+        updated.cube = pd.concat([self.cube, cells], ignore_index=True)
+        updated.rows = self.rows.extend(frame)
+        updated.cells = self.cells.extend(updated.cube)
+        updated.days = self.days.extend(frame, updated.cube)
+        updated.trends = self.trends.extend(updated.cube)
+        updated._finish((self._cube_hash + _hash_sum(cells)) % 2 ** 64)
+        return updated
+
+    # Filtered rows and the matching slice of the aggregate cube
+    def select(self, start=None, end=None, subject=None):
+        return (
+            self.rows.select(start, end, subject),
+            self.cells.select(start, end, subject),
+        )
+
+
+def _hash_sum(cube):
+    return int(pd.util.hash_pandas_object(cube, index=False).sum())
+
+
+# Rows of a date-sorted frame within a date range, among `subjects` and with
+# `column` between `low` and `high`, still date-sorted. Each filter is only
+# applied when given; the date range is a binary-searched slice.
+def filter_rows(frame, subjects=None, start=None, end=None, column=None, low=None, high=None):
+    dates = frame['date'].to_numpy()
+    lo = 0 if start is None else dates.searchsorted(np.datetime64(pd.Timestamp(start)), side='left')
+    hi = len(frame) if end is None else dates.searchsorted(np.datetime64(pd.Timestamp(end)), side='right')
+    rows = frame.iloc[lo:hi]
+    if subjects:
+        rows = rows[rows['subject'].isin(subjects)]
+    if column is not None:
+        rows = rows[rows[column].between(low, high)]
+    return rows
+
+
+# One page of a date-sorted frame without sorting or copying the rest of it
+def page_rows(frame, page, page_size, newest_first=False, columns=None):
+    total = len(frame)
+    if newest_first:
+        hi = max(total - page * page_size, 0)
+        rows = frame.iloc[max(hi - page_size, 0):hi].iloc[::-1]
+    else:
+        rows = frame.iloc[page * page_size:(page + 1) * page_size]
+    return rows if columns is None else rows[columns]
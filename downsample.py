@@ -0,0 +1,89 @@
+import numpy as np
+
+import aggregates
+
+# Server-side downsampling for the trend line chart.
+#
+# Plotting every (subject, date) point of a multi-year history sends thousands
+# of markers to the browser. trend_series() first rolls long windows up into
+# weekly or monthly averages (recomputed from the cube's sums and counts, so
+# they are true averages over the tests, not averages of daily averages), then
+# caps each subject's line with Largest-Triangle-Three-Buckets, which keeps the
+# visually significant peaks and dips. The payload stays bounded no matter how
+# much history is selected.
+
+MAX_POINTS_PER_SUBJECT = 400
+
+# (longest window in days, period frequency, label); the last entry catches all
+ROLLUPS = [
+    (180, None, 'daily'),
+    (3 * 365, 'W', 'weekly'),
+    (None, 'M', 'monthly'),
+]
+
+
+def resolution_for(span_days):
+    for max_days, freq, label in ROLLUPS:
+        if max_days is None or span_days <= max_days:
+            return freq, label
+
+
+def rollup(cube, freq, columns):
+    periods = cube['date'].dt.to_period(freq).dt.start_time
+    grouped = (cube.assign(date=periods)
+               .groupby(['subject', 'date'], observed=True)[['n'] + columns].sum())
+    return grouped[columns].div(grouped['n'], axis=0).reset_index()
+
+
+# Indices of `threshold` points chosen by Largest-Triangle-Three-Buckets
+def lttb(x, y, threshold):
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    # Bucket edges over the interior points; first and last are always kept
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    previous = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point for the final bucket)
+        next_start, next_stop = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x = x[next_start:next_stop].mean()
+        avg_y = y[next_start:next_stop].mean()
+
+        areas = np.abs(
+            (x[previous] - avg_x) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (avg_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+    return selected
+
+
+# Trend line input for a cube slice: (series, resolution label)
+def trend_series(cube, columns=('percentage', '30_mark_scale'), max_points=MAX_POINTS_PER_SUBJECT):
+    columns = list(columns)
+    if cube.empty:
+        return aggregates.subject_date_means(cube, columns), 'daily'
+
+    span_days = (cube['date'].max() - cube['date'].min()).days
+    freq, resolution = resolution_for(span_days)
+    if freq is None:
+        series = aggregates.subject_date_means(cube, columns)
+    else:
+        series = rollup(cube, freq, columns)
+
+    keep = []
+    for rows in series.groupby('subject', observed=True).indices.values():
+        dates = series['date'].to_numpy()[rows].astype('int64')
+        values = series[columns[0]].to_numpy()[rows]
+        keep.append(rows[lttb(dates, values, max_points)])
+    if keep:
+        series = series.iloc[np.sort(np.concatenate(keep))].reset_index(drop=True)
+    return series, resolution
@@ -0,0 +1,64 @@
+import gzip
+import tempfile
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Lazy, chunked export of the filtered rows.
+#
+# Nothing here runs until a download is actually requested: the sidebar passes
+# a callable to st.download_button, which Streamlit only invokes on click. The
+# rows are then written chunk by chunk into an unbuffered temporary file, so the
+# whole CSV never has to exist as one string plus a second bytes copy.
+
+CHUNK_ROWS = 50_000
+
+
+def iter_csv_chunks(frame, chunk_rows=CHUNK_ROWS):
+    for start in range(0, max(len(frame), 1), chunk_rows):
+        chunk = frame.iloc[start:start + chunk_rows]
+        yield chunk.to_csv(index=False, header=start == 0).encode('utf-8')
+
+
+def write_csv(frame, sink):
+    for chunk in iter_csv_chunks(frame):
+        sink.write(chunk)
+
+
+def write_csv_gzip(frame, sink):
+    with gzip.GzipFile(fileobj=sink, mode='wb') as compressed:
+        write_csv(frame, compressed)
+
+
+def write_parquet(frame, sink):
+    schema = pa.Schema.from_pandas(frame, preserve_index=False)
+    with pq.ParquetWriter(sink, schema, compression='zstd') as writer:
+        for start in range(0, len(frame), CHUNK_ROWS):
+            chunk = frame.iloc[start:start + CHUNK_ROWS]
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+# label -> (file extension, mime type, writer)
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv', write_csv),
+    'CSV (gzip)': ('csv.gz', 'application/gzip', write_csv_gzip),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet', write_parquet),
+}
+
+
+def export_file(frame, export_format='CSV'):
+    _, _, writer = EXPORT_FORMATS[export_format]
+    # Unbuffered (a raw file object) so Streamlit can stream it back out
+    sink = tempfile.TemporaryFile(mode='w+b', buffering=0)
+    writer(frame, sink)
+    sink.seek(0)
+    return sink
+
+
+def file_name(base_name, export_format='CSV'):
+    extension, _, _ = EXPORT_FORMATS[export_format]
+    return f"{base_name}.{extension}"
+
+
+def mime_type(export_format='CSV'):
+    return EXPORT_FORMATS[export_format][1]
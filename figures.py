@@ -0,0 +1,286 @@
+import hashlib
+import threading
+
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+
+import memo
+
+# Chart builders and the figure cache.
+#
+# Each builder turns one input aggregate into a finished Plotly figure. Building
+# figures with plotly.express is a large share of a rerun, so FigureCache keeps
+# finished figures (and, on request, their JSON) keyed on the chart name plus a
+# content hash of its inputs. Only charts whose inputs changed are rebuilt.
+
+SUBJECT_COLORS = {'Physics': '#3b82f6', 'Chemistry': '#10b981', 'Biology': '#f59e0b'}
+
+
+# Line chart for percentage trends over time
+def trend_figure(subject_comparison, resolution='daily'):
+    title = 'Performance Trend Over Time'
+    if resolution != 'daily':
+        title += f' ({resolution} averages)'
+    fig = px.line(
+        subject_comparison,
+        x='date',
+        y='percentage',
+        color='subject',
+        markers=True,
+        labels={'percentage': 'Percentage (%)', 'date': 'Date', 'subject': 'Subject'},
+        title=title,
+        color_discrete_map=SUBJECT_COLORS
+    )
+    fig.update_layout(
+        height=400,
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        xaxis_title="Date",
+        yaxis_title="Percentage (%)",
+        hovermode="x unified"
+    )
+    return fig
+
+
+# Subject-wise comparison barplot
+def subject_bar_figure(subject_avg):
+    fig = px.bar(
+        subject_avg,
+        x='subject',
+        y='percentage',
+        color='subject',
+        labels={'percentage': 'Average Percentage (%)', 'subject': 'Subject'},
+        title='Subject-wise Performance Comparison',
+        color_discrete_map=SUBJECT_COLORS
+    )
+    fig.update_layout(
+        height=400,
+        xaxis_title="Subject",
+        yaxis_title="Average Percentage (%)"
+    )
+    return fig
+
+
+# Heatmap for metrics by subject
+def metrics_heatmap_figure(subject_avg):
+    metrics_heatmap = pd.pivot_table(
+        subject_avg,
+        values=['accuracy_rate', 'attempt_rate', 'penalty_rate'],
+        index='subject',
+        observed=True
+    ).reset_index()
+
+    metrics_heatmap = metrics_heatmap.rename(columns={
+        'accuracy_rate': 'Accuracy',
+        'attempt_rate': 'Attempt Rate',
+        'penalty_rate': 'Penalty Rate'
+    })
+
+    metrics_heatmap_long = pd.melt(
+        metrics_heatmap,
+        id_vars=['subject'],
+        value_vars=['Accuracy', 'Attempt Rate', 'Penalty Rate'],
+        var_name='Metric',
+        value_name='Rate'
+    )
+
+    fig = px.density_heatmap(
+        metrics_heatmap_long,
+        x='Metric',
+        y='subject',
+        z='Rate',
+        color_continuous_scale='RdYlGn_r' if 'Penalty Rate' in metrics_heatmap_long['Metric'].unique() else 'RdYlGn',
+        labels={'Rate': 'Value (0-1)', 'subject': 'Subject', 'Metric': 'Metric'},
+        title='Key Performance Metrics by Subject'
+    )
+    fig.update_layout(
+        height=400,
+        xaxis_title="Metric",
+        yaxis_title="Subject"
+    )
+    return fig
+
+
+# Question attempt distribution
+def question_distribution_figure(question_dist):
+    question_dist_long = pd.melt(
+        question_dist,
+        id_vars=['subject'],
+        value_vars=['correct', 'incorrect', 'unattempted'],
+        var_name='Status',
+        value_name='Count'
+    )
+
+    fig = px.bar(
+        question_dist_long,
+        x='subject',
+        y='Count',
+        color='Status',
+        barmode='stack',
+        labels={'Count': 'Number of Questions', 'subject': 'Subject', 'Status': 'Question Status'},
+        title='Question Attempt Distribution by Subject',
+        color_discrete_map={'correct': '#10b981', 'incorrect': '#ef4444', 'unattempted': '#d1d5db'}
+    )
+    fig.update_layout(
+        height=400,
+        xaxis_title="Subject",
+        yaxis_title="Number of Questions"
+    )
+    return fig
+
+
+# Performance gauge chart
+def performance_gauge_figure(overall_perf, tier_color):
+    fig = go.Figure(go.Indicator(
+        mode="gauge+number",
+        value=overall_perf,
+        domain={'x': [0, 1], 'y': [0, 1]},
+        title={'text': "Overall Performance", 'font': {'size': 24}},
+        gauge={
+            'axis': {'range': [0, 100], 'tickwidth': 1, 'tickcolor': "darkblue"},
+            'bar': {'color': tier_color},
+            'bgcolor': "white",
+            'borderwidth': 2,
+            'bordercolor': "gray",
+            'steps': [
+                {'range': [0, 40], 'color': '#fee2e2'},
+                {'range': [40, 60], 'color': '#fef3c7'},
+                {'range': [60, 75], 'color': '#d1fae5'},
+                {'range': [75, 90], 'color': '#a7f3d0'},
+                {'range': [90, 100], 'color': '#6ee7b7'}
+            ],
+            'threshold': {
+                'line': {'color': "red", 'width': 4},
+                'thickness': 0.75,
+                'value': 60
+            }
+        }
+    ))
+    fig.update_layout(
+        height=400,
+        font={'color': "#1e3a8a", 'family': "Arial"}
+    )
+    return fig
+
+
+# Recent test radar chart
+def recent_radar_figure(recent_tests):
+    # Prepare data for radar chart
+    radar_data = recent_tests[['subject', 'accuracy_rate', 'attempt_rate', 'percentage']].copy()
+
+    # Normalize percentage to 0-1 scale for radar chart
+    radar_data['percentage_norm'] = radar_data['percentage'] / 100
+
+    # Convert to long format for radar chart
+    radar_data_long = pd.melt(
+        radar_data,
+        id_vars=['subject'],
+        value_vars=['accuracy_rate', 'attempt_rate', 'percentage_norm'],
+        var_name='Metric',
+        value_name='Value'
+    )
+
+    # Rename metrics for display
+    radar_data_long['Metric'] = radar_data_long['Metric'].replace({
+        'accuracy_rate': 'Accuracy',
+        'attempt_rate': 'Attempt Rate',
+        'percentage_norm': 'Performance'
+    })
+
+    fig = px.line_polar(
+        radar_data_long,
+        r='Value',
+        theta='Metric',
+        color='subject',
+        line_close=True,
+        range_r=[0, 1],
+        labels={'Value': 'Score (0-1)', 'Metric': 'Metric'},
+        title='Recent Test Performance Radar',
+        color_discrete_map=SUBJECT_COLORS
+    )
+    fig.update_layout(
+        polar=dict(
+            radialaxis=dict(
+                visible=True,
+                range=[0, 1]
+            )
+        ),
+        showlegend=True
+    )
+    return fig
+
+
+def content_hash(*inputs):
+    digest = hashlib.sha1()
+    for value in inputs:
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            labels = list(value.columns) if isinstance(value, pd.DataFrame) else value.name
+            digest.update(repr(labels).encode('utf-8'))
+            digest.update(pd.util.hash_pandas_object(value, index=False).to_numpy().tobytes())
+        else:
+            digest.update(repr(value).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class CachedFigure:
+    def __init__(self, figure, input_bytes):
+        self.figure = figure
+        self.input_bytes = input_bytes
+        self._json = None
+
+    # Serialized once, on first request
+    @property
+    def json(self):
+        if self._json is None:
+            self._json = pio.to_json(self.figure, validate=False)
+        return self._json
+
+    # A figure holds roughly a copy of its input data plus layout, and the
+    # JSON about as much again once serialized
+    @property
+    def nbytes(self):
+        return 2 * self.input_bytes + 16 * 1024
+
+
+class FigureCache:
+    def __init__(self, max_bytes=32 * 1024 * 1024, max_entries=512):
+        self._memo = memo.LRUMemo(max_bytes, max_entries, sizeof=lambda entry: entry.nbytes)
+        self._lock = threading.Lock()
+        self.counters = {}
+
+    def _count(self, name, outcome):
+        with self._lock:
+            counts = self.counters.setdefault(name, {'hits': 0, 'misses': 0})
+            counts[outcome] += 1
+
+    def entry(self, name, build, *inputs):
+        key = (name, content_hash(*inputs))
+        entry = self._memo.get(key)
+        if entry is not None:
+            self._count(name, 'hits')
+            return entry
+
+        self._count(name, 'misses')
+        entry = CachedFigure(build(*inputs), sum(memo.estimate_size(i) for i in inputs))
+        self._memo.put(key, entry)
+        return entry
+
+    # Finished figure for these inputs, built only on a miss
+    def figure(self, name, build, *inputs):
+        return self.entry(name, build, *inputs).figure
+
+    # Serialized figure JSON for these inputs
+    def json(self, name, build, *inputs):
+        return self.entry(name, build, *inputs).json
+
+    def stats(self):
+        with self._lock:
+            counters = {name: dict(counts) for name, counts in self.counters.items()}
+        return {
+            'hits': sum(c['hits'] for c in counters.values()),
+            'misses': sum(c['misses'] for c in counters.values()),
+            'charts': counters,
+            'cache': self._memo.stats(),
+        }
@@ -0,0 +1,187 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import schema
+
+# Reading and validating exports.
+#
+# Exports arrive as .xlsx, .csv, .parquet or .json from different test
+# centres. Each format has a reader in READERS (add more with @reader) that
+# only turns the file into a raw frame; validate() then checks every row in
+# one vectorized pass and splits the rows into the normalized ones and the
+# rejected ones, each rejected row carrying the reasons it failed:
+#
+#     missing value, bad date, not a number, counts do not add up, ...
+#
+# Rows for tests that were scheduled but not taken (no questions, no results)
+# are reported as 'not taken'. Nothing is dropped without a reason.
+#
+# load_files() reads many files at once on a thread pool (the CSV, Parquet
+# and JSON parsers release the GIL), or on a process pool when
+# STUDENT_DASHBOARD_INGEST_PROCESSES=1, which also spreads the pure-Python
+# .xlsx parsing across cores.
+
+# Dates in the exports are day-first; ISO dates are accepted as well
+DATE_FORMAT = '%d-%m-%Y'
+RATE_COLUMNS = ['accuracy_rate', 'attempt_rate', 'penalty_rate']
+NOT_TAKEN = 'not taken'
+# Float32 rounding in exports that were already normalized once
+TOLERANCE = 1e-4
+WORKERS = int(os.environ.get("STUDENT_DASHBOARD_INGEST_WORKERS", "0")) or None
+USE_PROCESSES = os.environ.get("STUDENT_DASHBOARD_INGEST_PROCESSES") == "1"
+
+REJECTED_COLUMNS = ['source', 'row', 'reason'] + schema.COLUMNS
+
+# extension -> function(path) returning a raw DataFrame
+READERS = {}
+
+
+def reader(*extensions):
+    def register(read):
+        for extension in extensions:
+            READERS[extension.lower()] = read
+        return read
+    return register
+
+
+@reader('.xlsx')
+def read_xlsx(path):
+    return pd.read_excel(path)
+
+
+@reader('.csv')
+def read_csv(path):
+    return pd.read_csv(path)
+
+
+@reader('.parquet')
+def read_parquet(path):
+    return pd.read_parquet(path)
+
+
+# A list of records (or anything pandas reads as a table); dates are left as
+# written so they are parsed like every other format's
+@reader('.json')
+def read_json(path):
+    return pd.read_json(path, convert_dates=False, dtype=False)
+
+
+# Glob patterns for every registered format
+def patterns():
+    return tuple(f'*{extension}' for extension in READERS)
+
+
+def read_source(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in READERS:
+        raise schema.SchemaError(f"no reader for {extension or 'files without an extension'}")
+    return READERS[extension](path)
+
+
+# Test days as midnight timestamps: ISO8601 strings and datetime columns can
+# carry a time of day, which would split one test day into several
+def parse_dates(values):
+    if pd.api.types.is_datetime64_any_dtype(values):
+        if values.dt.tz is not None:
+            values = values.dt.tz_localize(None)
+        return values.dt.normalize()
+    parsed = pd.to_datetime(values, format=DATE_FORMAT, errors='coerce')
+    retry = parsed.isna() & values.notna()
+    if retry.any():
+        parsed[retry] = pd.to_datetime(values[retry], format='ISO8601', errors='coerce')
+    return parsed.dt.normalize()
+
+
+def empty_rejected():
+    return pd.DataFrame({column: pd.Series(dtype='str') for column in REJECTED_COLUMNS}).astype({'row': 'int64'})
+
+
+# Split raw rows into (valid rows, rejected rows); the valid rows have parsed
+# dates and numbers, ready for schema.normalize(). Raises SchemaError only
+# when the file as a whole is unusable (missing columns).
+def validate(raw, source=''):
+    missing = [column for column in schema.COLUMNS if column not in raw.columns]
+    if missing:
+        raise schema.SchemaError(f"missing columns: {', '.join(missing)}")
+    raw = raw[schema.COLUMNS].reset_index(drop=True)
+
+    dates = parse_dates(raw['date'])
+    numbers = raw[schema.COUNT_COLUMNS + schema.FLOAT_COLUMNS].apply(pd.to_numeric, errors='coerce')
+    counts = numbers[schema.COUNT_COLUMNS]
+    blank = raw.isna()
+    limits = np.iinfo(schema.COUNT_DTYPE)
+
+    results = ['correct', 'incorrect', 'unattempted'] + schema.FLOAT_COLUMNS
+    not_taken = (counts['no_of_questions'] == 0) & blank[results].all(axis=1)
+    checks = pd.DataFrame({
+        'missing value': blank.any(axis=1),
+        'bad date': dates.isna() & ~blank['date'],
+        'not a number': (numbers.isna() & ~blank[numbers.columns]).any(axis=1),
+        'fractional count': (counts != counts.round()).any(axis=1) & counts.notna().all(axis=1),
+        'count out of range': ((counts < 0) | (counts > limits.max)).any(axis=1),
+        'counts do not add up': (
+            counts['correct'] + counts['incorrect'] + counts['unattempted'] != counts['no_of_questions']
+        ) & counts.notna().all(axis=1),
+        'rate outside [0, 1]': (
+            (numbers[RATE_COLUMNS] < -TOLERANCE) | (numbers[RATE_COLUMNS] > 1 + TOLERANCE)
+        ).any(axis=1),
+        'percentage above 100': numbers['percentage'] > 100 + TOLERANCE,
+    })
+    # A placeholder row for a test not taken yet is reported as just that
+    checks.loc[not_taken] = False
+    checks.insert(0, NOT_TAKEN, not_taken)
+
+    bad = checks.any(axis=1)
+    rows = raw[~bad].assign(date=dates[~bad], **{
+        column: numbers.loc[~bad, column] for column in numbers.columns
+    })
+    if not bad.any():
+        return rows, empty_rejected()
+
+    failed = checks[bad]
+    rejected = raw[bad].astype('str').assign(
+        source=source,
+        row=failed.index.to_numpy(dtype='int64'),
+        # Boolean matrix times names: the names of every failed check
+        reason=failed.dot(failed.columns + '; ').str.rstrip('; '),
+    )
+    return rows, rejected[REJECTED_COLUMNS].reset_index(drop=True)
+
+
+def _executor(workers, processes):
+    if processes:
+        return ProcessPoolExecutor(max_workers=workers)
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ingest')
+
+
+# {path: load(path)} for many files at once (e.g. data_store.load_dataset);
+# a file that fails maps to the exception it raised, so one bad export does
+# not stop the others
+def load_files(paths, load, workers=WORKERS, processes=USE_PROCESSES):
+    results = {}
+    if len(paths) <= 1 or workers == 1:
+        for path in paths:
+            try:
+                results[path] = load(path)
+            except Exception as error:
+                results[path] = error
+        return results
+
+    with _executor(workers, processes) as pool:
+        futures = {path: pool.submit(load, path) for path in paths}
+        for path, future in futures.items():
+            try:
+                results[path] = future.result()
+            except Exception as error:
+                results[path] = error
+    return results
+
+
+# Rejected-row counts per reason, e.g. {'not taken': 12, 'bad date': 1}
+def reason_counts(rejected):
+    if rejected.empty:
+        return {}
+    return rejected['reason'].str.split('; ').explode().value_counts().to_dict()
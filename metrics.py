@@ -0,0 +1,137 @@
+import pandas as pd
+
+import aggregates
+import downsample
+import profiling
+import recommendations
+
+# Derived views behind the dashboard.
+#
+# Each entry of SECTIONS computes the part of the page one section shows for
+# a filter selection, from the matching slice of the aggregate cube and the
+# dataset's indexes, as a plain dict. The query engine (query.py) memoizes
+# every section separately under the key returned by view_key(), so the page
+# only computes what the cards and the open tab need. build_view() merges all
+# of them, plus the filtered rows, for headless callers.
+
+SUBJECT_METRIC_COLUMNS = ['percentage', 'accuracy_rate', 'attempt_rate', 'penalty_rate']
+
+
+# Define performance tiers
+def get_performance_tier(percentage):
+    if percentage >= 90:
+        return "Excellent", "#10b981"  # Green
+    elif percentage >= 75:
+        return "Good", "#059669"  # Green-blue
+    elif percentage >= 60:
+        return "Satisfactory", "#f59e0b"  # Yellow
+    else:
+        return "Needs Improvement", "#ef4444"  # Red
+
+
+# Tests taken on the last test day of the selection, from the day index
+def recent_tests(data, start=None, end=None, subject=None):
+    recent_date = data.days.last(start, end, subject)
+    if recent_date is None:
+        return None, data.frame.iloc[0:0]
+    return recent_date, data.days.rows(recent_date, subject)
+
+
+# Change in average percentage between the first and the last test day
+def first_last_improvement(data, start=None, end=None, subject=None):
+    first_date = data.days.first(start, end, subject)
+    last_date = data.days.last(start, end, subject)
+    if first_date is None or first_date == last_date:
+        return None
+    return {
+        'first_date': first_date,
+        'last_date': last_date,
+        'improvement': (data.days.means(last_date, subject)['percentage']
+                        - data.days.means(first_date, subject)['percentage']),
+    }
+
+
+# Ranges covering the whole dataset share a key with the unfiltered view
+def view_key(data, start=None, end=None, subject=None):
+    # A dataset without rows (every row rejected) has no bounds to compare to
+    if data.first_date is not None:
+        if start is not None and pd.Timestamp(start) <= data.first_date:
+            start = None
+        if end is not None and pd.Timestamp(end) >= data.last_date:
+            end = None
+    return (
+        data.version,
+        None if start is None else pd.Timestamp(start).date(),
+        None if end is None else pd.Timestamp(end).date(),
+        subject,
+    )
+
+
+# Overall means, tier and short-term trends for the metric cards
+def overview(data, start=None, end=None, subject=None):
+    cube = data.cells.select(start, end, subject)
+    overall = aggregates.overall_means(cube)
+    return {
+        'overall': overall,
+        'performance_tier': get_performance_tier(overall['percentage']),
+        # Recent (7-day) against longer-run (30-day) average at the end
+        # of the range, answered from the dataset's prefix sums
+        'trends': data.trends.momentum(start, end, subject),
+        'tests': int(cube['date'].nunique()),
+    }
+
+
+def subject_tables(data, start=None, end=None, subject=None):
+    cube = data.cells.select(start, end, subject)
+    return {
+        'subject_metrics': aggregates.subject_means(cube, SUBJECT_METRIC_COLUMNS),
+        'subject_trends': data.trends.subject_summary(start, end, subject),
+        'question_dist': aggregates.subject_sums(cube, ['correct', 'incorrect', 'unattempted']),
+    }
+
+
+# Rolled up and LTTB-capped for the trend chart
+def trend_chart(data, start=None, end=None, subject=None):
+    series, resolution = downsample.trend_series(data.cells.select(start, end, subject))
+    return {'trend_series': series, 'trend_resolution': resolution}
+
+
+def recent(data, start=None, end=None, subject=None):
+    recent_date, tests = recent_tests(data, start, end, subject)
+    return {'recent_date': recent_date, 'recent_tests': tests}
+
+
+def improvement(data, start=None, end=None, subject=None):
+    return {'improvement': first_last_improvement(data, start, end, subject)}
+
+
+def recommendation_results(data, start=None, end=None, subject=None):
+    cube = data.cells.select(start, end, subject)
+    return {'recommendations': recommendations.evaluate(aggregates.subject_means(cube, SUBJECT_METRIC_COLUMNS))}
+
+
+# name -> function(data, start, end, subject) returning a dict of results
+SECTIONS = {
+    'overview': overview,
+    'subjects': subject_tables,
+    'trend': trend_chart,
+    'recent': recent,
+    'improvement': improvement,
+    'recommendations': recommendation_results,
+}
+
+
+def build_section(name, data, start=None, end=None, subject=None):
+    with profiling.section(f'view.{name}'):
+        return SECTIONS[name](data, start, end, subject)
+
+
+def build_view(data, start=None, end=None, subject=None):
+    with profiling.section('view.filter'):
+        filtered_df, filtered_cube = data.select(start, end, subject)
+    profiling.count('rows_selected', len(filtered_df))
+
+    view = {'filtered_df': filtered_df, 'filtered_cube': filtered_cube}
+    for name in SECTIONS:
+        view.update(build_section(name, data, start, end, subject))
+    return view
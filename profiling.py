@@ -0,0 +1,181 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+# Lightweight timing hooks for the dashboard.
+#
+# Each Streamlit rerun opens a Run on the process-wide Profiler; code anywhere
+# below it (app.py, metrics.build_view(), ...) wraps its work in
+# `with profiling.section(name):` and reports sizes with profiling.count().
+# Sections and counters attach to the run active on the current thread, so
+# outside a run (batch jobs, scripts) they cost a thread-local lookup and
+# nothing else. A finished run folds its timings into bounded per-section
+# sample windows, which the sidebar panel summarizes as percentiles across
+# every session, and (when STUDENT_DASHBOARD_PROFILE is set) writes one JSON
+# log line per rerun. A fragment that reruns on its own (Profiler.fragment)
+# is recorded as a rerun of just that fragment.
+
+ENABLED = os.environ.get('STUDENT_DASHBOARD_PROFILE', '') not in ('', '0')
+SAMPLES_PER_SECTION = 1024
+PERCENTILES = (50, 90, 99)
+
+logger = logging.getLogger(__name__)
+
+_active = threading.local()
+
+
+# Streamlit configures no handler for this logger and leaves the root logger
+# at WARNING, so the timing lines get a handler of their own on stderr
+def _enable_log():
+    if logger.handlers:
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(asctime)s %(name)s %(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def current_run():
+    return getattr(_active, 'run', None)
+
+
+# Time a block against the current run (no-op without one)
+@contextmanager
+def section(name):
+    run = current_run()
+    if run is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        run.record(name, time.perf_counter() - start)
+
+
+# Add to a counter of the current run, e.g. rows processed or bytes serialized
+def count(name, amount=1):
+    run = current_run()
+    if run is not None:
+        run.count(name, amount)
+
+
+class Run:
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self.started = time.perf_counter()
+        self.timings = {}
+        self.counters = {}
+
+    def record(self, name, seconds):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    # Close the run: fold it into the profiler and detach it from the thread
+    def finish(self):
+        self.record('total', time.perf_counter() - self.started)
+        if current_run() is self:
+            _active.run = None
+        self.profiler.add_run(self)
+        return self
+
+
+class Profiler:
+    def __init__(self, samples=SAMPLES_PER_SECTION, log=ENABLED):
+        self.samples = samples
+        self.log = log
+        if log:
+            _enable_log()
+        self._timings = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+        self.runs = 0
+
+    # Start collecting for the calling thread (replaces an unfinished run,
+    # e.g. one cut short by a rerun)
+    def start_run(self):
+        run = Run(self)
+        _active.run = run
+        return run
+
+    def add_run(self, run):
+        with self._lock:
+            self.runs += 1
+            for name, seconds in run.timings.items():
+                self._sample(name, seconds)
+            for name, amount in run.counters.items():
+                self._counters[name] = self._counters.get(name, 0) + amount
+        if self.log:
+            logger.info(json.dumps({
+                'event': 'rerun',
+                'timings_ms': {name: round(seconds * 1000, 3) for name, seconds in run.timings.items()},
+                'counters': run.counters,
+            }))
+
+    def _sample(self, name, seconds):
+        if name not in self._timings:
+            self._timings[name] = deque(maxlen=self.samples)
+        self._timings[name].append(seconds)
+
+    # Time a fragment's body. Called during a full rerun it is a section of
+    # that rerun; when the fragment reruns on its own (`rerun`), it gets a run
+    # of its own, folded in like any other rerun (without a 'total'). That
+    # run replaces whatever an interrupted script left on the thread.
+    @contextmanager
+    def fragment(self, name, rerun=False):
+        if not rerun:
+            with section(name):
+                yield
+            return
+        run = self.start_run()
+        try:
+            with section(name):
+                yield
+        finally:
+            if current_run() is run:
+                _active.run = None
+            self.add_run(run)
+
+    # Time work that happens outside a rerun (e.g. a deferred download)
+    @contextmanager
+    def measure(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self._sample(name, seconds)
+            if self.log:
+                logger.info(json.dumps({'event': name, 'ms': round(seconds * 1000, 3)}))
+
+    def add(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    # Per-section milliseconds over the recent sample window, in first-seen order
+    def summary(self):
+        with self._lock:
+            samples = {name: np.array(values) for name, values in self._timings.items()}
+        rows = []
+        for name, values in samples.items():
+            row = {'section': name, 'calls': len(values), 'last_ms': values[-1] * 1000,
+                   'mean_ms': values.mean() * 1000}
+            for q, value in zip(PERCENTILES, np.percentile(values, PERCENTILES) * 1000):
+                row[f'p{q}_ms'] = value
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+    def counters(self):
+        with self._lock:
+            return dict(self._counters)
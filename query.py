@@ -0,0 +1,238 @@
+import hashlib
+import json
+import logging
+from datetime import date
+
+import pandas as pd
+
+import memo
+import metrics
+import recommendations
+import registry
+
+logger = logging.getLogger(__name__)
+# Query engine behind the dashboard and the JSON API.
+#
+# QueryEngine answers every question the page asks (filtered rows, subject
+# aggregates, trends, recent tests, recommendations) for any student and
+# filter, without rendering anything. Each view section (see metrics.SECTIONS)
+# is memoized on its own under the normalized filter key (metrics.view_key),
+# which starts with the dataset version, so a refresh never serves stale
+# numbers and a caller only pays for the sections it asks for. The named
+# queries in QUERIES turn sections into plain JSON-ready dicts; their encoded
+# responses are cached as bytes with an ETag, so repeated API calls cost a
+# dictionary lookup.
+#
+# The Streamlit page uses rows() and section() directly, one section per tab;
+# api.py serves response() and batch() over HTTP.
+
+
+class QueryError(ValueError):
+    pass
+
+
+def _number(value):
+    if value is None or pd.isna(value):
+        return None
+    return float(value)
+
+
+def _date(value):
+    return None if value is None or pd.isna(value) else pd.Timestamp(value).date().isoformat()
+
+
+def _records(frame):
+    return json.loads(frame.to_json(orient='records', date_format='iso', double_precision=6))
+
+
+def summary(view, standing=None):
+    overall = view['overall']
+    improvement = view['improvement']
+    return {
+        'average_percentage': _number(overall['percentage']),
+        'accuracy_rate': _number(overall['accuracy_rate'] * 100),
+        'attempt_rate': _number(overall['attempt_rate'] * 100),
+        'penalty_rate': _number(overall['penalty_rate'] * 100),
+        'performance_tier': view['performance_tier'][0],
+        'trends': {name: _number(change) for name, change in view['trends'].items()},
+        'improvement': None if improvement is None else {
+            'first_date': _date(improvement['first_date']),
+            'last_date': _date(improvement['last_date']),
+            'change': _number(improvement['improvement']),
+        },
+        'tests': view['tests'],
+        'cohort': None if standing is None else {
+            'percentile': _number(standing['percentile']),
+            'rank': int(standing['rank']),
+            'size': int(standing['size']),
+        },
+    }
+
+
+def subjects(view, standing=None):
+    table = view['subject_metrics'].astype({'subject': str}).merge(
+        view['subject_trends'].astype({'subject': str}), on='subject', how='left'
+    )
+    return {
+        'subjects': _records(table),
+        'questions': _records(view['question_dist'].astype({'subject': str})),
+    }
+
+
+def trend(view, standing=None):
+    return {
+        'resolution': view['trend_resolution'],
+        'series': _records(view['trend_series'].astype({'subject': str})),
+    }
+
+
+def recent(view, standing=None):
+    columns = ['date', 'subject', 'percentage', 'accuracy_rate', 'attempt_rate']
+    return {
+        'date': _date(view['recent_date']),
+        'tests': _records(view['recent_tests'][columns].astype({'subject': str})),
+    }
+
+
+def recommendation_messages(view, standing=None):
+    results = view['recommendations']
+    return {
+        section: [
+            {'label': label, 'message': message, 'style': style}
+            for label, message, style in recommendations.messages(results, section)
+        ]
+        for section in ('focus', 'study', 'insight')
+    }
+
+
+# name -> (function(sections, cohort standing) returning a JSON-ready dict,
+#          the metrics.SECTIONS it reads)
+QUERIES = {
+    'summary': (summary, ('overview', 'improvement')),
+    'subjects': (subjects, ('subjects',)),
+    'trend': (trend, ('trend',)),
+    'recent': (recent, ('recent',)),
+    'recommendations': (recommendation_messages, ('recommendations',)),
+}
+
+
+# None for "no bound", a date as is, or a YYYY-MM-DD string
+def parse_date(value):
+    if value is None or value == '':
+        return None
+    if isinstance(value, date):
+        return pd.Timestamp(value).date()
+    if not isinstance(value, str):
+        raise QueryError(f"invalid date: {value!r} (expected YYYY-MM-DD)")
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise QueryError(f"invalid date: {value!r} (expected YYYY-MM-DD)")
+
+
+def encode(result):
+    return json.dumps(result, separators=(',', ':'), allow_nan=False).encode('utf-8')
+
+
+class QueryEngine:
+    def __init__(self, datasets=None, views=None, responses=None):
+        self.datasets = datasets if datasets is not None else registry.DatasetRegistry()
+        # One entry per section and filter selection
+        self.views = views if views is not None else memo.LRUMemo(max_bytes=64 * 1024 * 1024, max_entries=1024)
+        # Encoded responses are small; many more of them fit
+        self.responses = responses if responses is not None else memo.LRUMemo(
+            max_bytes=16 * 1024 * 1024, max_entries=4096, sizeof=lambda entry: len(entry[0]) + 64)
+
+    def students(self):
+        return self.datasets.students()
+
+    def _dataset(self, student):
+        if not isinstance(student, str) or student not in self.datasets.manifest['students']:
+            raise QueryError(f"unknown student: {student!r}")
+        return self.datasets.get(student)
+
+    # Rows matching a filter selection; a slice of the date index, not memoized
+    def rows(self, student, start=None, end=None, subject=None):
+        data = self._dataset(student)
+        return data.rows.select(*metrics.view_key(data, start, end, subject)[1:])
+
+    def _section(self, name, data, key):
+        return self.views.get_or_compute((name,) + key, lambda: metrics.build_section(name, data, *key[1:]))
+
+    # One memoized metrics.SECTIONS entry for a filter selection
+    def section(self, name, student, start=None, end=None, subject=None):
+        data = self._dataset(student)
+        return self._section(name, data, metrics.view_key(data, start, end, subject))
+
+    def standing(self, student, subject=None):
+        cohort = self.datasets.cohort()
+        if cohort is None:
+            return None
+        return cohort.student_standing(student, (subject, None))
+
+    # Validated (start, end, subject) for one student's dataset
+    def _filters(self, data, start, end, subject):
+        start, end = parse_date(start), parse_date(end)
+        if start is not None and end is not None and start > end:
+            raise QueryError(f"start {start} is after end {end}")
+        if subject is None or subject == '':
+            subject = None
+        elif not isinstance(subject, str) or subject not in data.rows.subject_rows:
+            raise QueryError(f"unknown subject: {subject!r}")
+        if data.days.first(start, end, subject) is None:
+            raise QueryError("no tests match the selected dates and subject")
+        return start, end, subject
+
+    def _resolve(self, name, student, start, end, subject):
+        if not isinstance(name, str) or name not in QUERIES:
+            raise QueryError(f"unknown query: {name!r}")
+        data = self._dataset(student)
+        key = metrics.view_key(data, *self._filters(data, start, end, subject))
+        # Only the summary reports the cohort standing, which moves when other
+        # students' results change
+        standing = self.standing(student, key[3]) if name == 'summary' else None
+        return data, key, standing
+
+    def _answer(self, name, data, key, standing):
+        function, sections = QUERIES[name]
+        view = {}
+        for section in sections:
+            view.update(self._section(section, data, key))
+        return function(view, standing)
+
+    def query(self, name, student, start=None, end=None, subject=None):
+        data, key, standing = self._resolve(name, student, start, end, subject)
+        return self._answer(name, data, key, standing)
+
+    # (encoded JSON, ETag) for a query, cached per dataset version and filter
+    def response(self, name, student, start=None, end=None, subject=None):
+        data, key, standing = self._resolve(name, student, start, end, subject)
+        response_key = (name, student) + key + (standing and tuple(sorted(standing.items())),)
+
+        def compute():
+            body = encode(self._answer(name, data, key, standing))
+            return body, hashlib.sha1(body).hexdigest()[:16]
+        return self.responses.get_or_compute(response_key, compute)
+
+    # Encoded JSON array answering many queries at once; each item is
+    # {"query": ..., "student": ..., "start": ..., "end": ..., "subject": ...}
+    # and failures are reported in place instead of failing the batch
+    def batch(self, requests):
+        if not isinstance(requests, list):
+            raise QueryError("batch body must be a JSON list of queries")
+        parts = []
+        for request in requests:
+            try:
+                if not isinstance(request, dict):
+                    raise QueryError("each query must be a JSON object")
+                body, _ = self.response(
+                    request.get('query'), request.get('student'),
+                    request.get('start'), request.get('end'), request.get('subject'),
+                )
+                parts.append(b'{"ok":true,"result":' + body + b'}')
+            except QueryError as error:
+                parts.append(encode({'ok': False, 'error': str(error)}))
+            except Exception:
+                logger.exception("batch query failed: %r", request)
+                parts.append(encode({'ok': False, 'error': "internal error"}))
+        return b'[' + b','.join(parts) + b']'
@@ -0,0 +1,138 @@
+import operator
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# Table-driven recommendation and insight engine.
+#
+# Every recommendation on the dashboard is one row of RULES: pick a subject by
+# a metric (its weakest or strongest subject), optionally require a specific
+# subject, compare the value against a threshold and emit a message. evaluate()
+# runs the whole table in one vectorized pass over a subject-level aggregate,
+# either for a single student or for many at once (rows keyed by a 'student'
+# column), which is what the nightly batch job relies on.
+#
+# section   where the message is shown ('focus', 'study' or 'insight')
+# metric    subject-level column the rule looks at
+# extreme   'min' or 'max': which subject the rule is about
+# op        comparison against threshold, or None to always match
+# subject   only match when the extreme subject is this one (None: any)
+# label     bold lead-in of the message (formatted)
+# message   message body (formatted with {subject} and {value})
+# style     colour for the recommendation cards, level for insights
+
+Rule = namedtuple('Rule', ['section', 'metric', 'extreme', 'op', 'threshold',
+                           'subject', 'label', 'message', 'style'])
+
+RULES = [
+    # Areas needing focus
+    Rule('focus', 'percentage', 'min', '<', 75, None,
+         "Overall Performance in {subject}", "{value:.2f}% - Focused study recommended", '#ef4444'),
+    Rule('focus', 'accuracy_rate', 'min', '<', 0.75, None,
+         "Accuracy in {subject}", "{value:.2f}% - Review core concepts", '#ef4444'),
+    Rule('focus', 'attempt_rate', 'min', '<', 0.85, None,
+         "Attempt Rate in {subject}", "{value:.2f}% - Practice more questions", '#ef4444'),
+    Rule('focus', 'penalty_rate', 'max', '>', 0.1, None,
+         "High Penalty Rate in {subject}", "{value:.2f}% - Be more careful with answers", '#ef4444'),
+
+    # Study recommendations
+    Rule('study', 'percentage', 'min', None, None, 'Physics',
+         "Physics", "Focus on practicing numerical problems and conceptual understanding", '#3b82f6'),
+    Rule('study', 'accuracy_rate', 'min', None, None, 'Chemistry',
+         "Chemistry", "Review fundamental concepts and practice more problems", '#10b981'),
+    Rule('study', 'attempt_rate', 'min', '<', 0.9, None,
+         "Time Management", "Practice timed mock tests to improve question attempt rate", '#f59e0b'),
+    Rule('study', 'penalty_rate', 'max', '>', 0.1, None,
+         "Accuracy", "Take a more measured approach to answering questions - don't rush!", '#ef4444'),
+
+    # Quick performance insights
+    Rule('insight', 'percentage', 'max', None, None, None,
+         "", "💪 Strongest Subject: {subject} with average score of {value:.2f}%", 'success'),
+    Rule('insight', 'percentage', 'min', '<', 70, None,
+         "", "🔍 Focus Area: {subject} with average score of {value:.2f}%", 'warning'),
+    Rule('insight', 'percentage', 'min', '>=', 70, None,
+         "", "👍 Your weakest subject is {subject} with a still good average of {value:.2f}%", 'info'),
+]
+
+OPERATORS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '==': operator.eq,
+}
+
+# Rates are stored as 0-1 fractions but shown as percentages
+PERCENT_SCALE = {'percentage': 1, 'accuracy_rate': 100, 'attempt_rate': 100, 'penalty_rate': 100}
+
+
+def rule_table(rules=RULES):
+    table = pd.DataFrame(rules, columns=Rule._fields)
+    table.insert(0, 'rule', np.arange(len(table)))
+    return table.rename(columns={'subject': 'required_subject'})
+
+
+def _long_metrics(subject_metrics, metrics, keys):
+    return subject_metrics.melt(
+        id_vars=keys + ['subject'], value_vars=metrics, var_name='metric', value_name='value'
+    ).dropna(subset=['value'])
+
+
+# One row per (student, metric, extreme) with the subject holding that extreme
+def _extremes(long, keys):
+    grouped = long.groupby(keys + ['metric'], sort=False)['value']
+    return pd.concat([
+        long.loc[grouped.idxmin()].assign(extreme='min'),
+        long.loc[grouped.idxmax()].assign(extreme='max'),
+    ], ignore_index=True)
+
+
+# Evaluate the rule table against a subject-level aggregate with columns
+# subject + metrics (+ student). With per_subject=True every subject is checked
+# against every rule instead of only each metric's weakest/strongest subject.
+def evaluate(subject_metrics, rules=RULES, per_subject=False):
+    table = rule_table(rules)
+    keys = ['student'] if 'student' in subject_metrics.columns else []
+    long = _long_metrics(subject_metrics, list(table['metric'].unique()), keys)
+    long['subject'] = long['subject'].astype(str)
+
+    if per_subject:
+        candidates = table.merge(long, on='metric')
+    else:
+        candidates = table.merge(_extremes(long, keys), on=['metric', 'extreme'])
+
+    matched = np.ones(len(candidates), dtype=bool)
+    for op, compare in OPERATORS.items():
+        uses_op = (candidates['op'] == op).to_numpy()
+        if uses_op.any():
+            result = compare(candidates['value'].to_numpy(), candidates['threshold'].to_numpy(dtype=float))
+            matched &= ~uses_op | result
+    required = candidates['required_subject']
+    matched &= (required.isna() | (required == candidates['subject'])).to_numpy()
+
+    hits = candidates[matched].sort_values(keys + ['rule'], kind='stable', ignore_index=True)
+    hits['display_value'] = hits['value'] * hits['metric'].map(PERCENT_SCALE).fillna(1)
+    return hits[keys + ['rule', 'section', 'metric', 'subject', 'value', 'display_value',
+                        'label', 'message', 'style']]
+
+
+# Results with label and message templates filled in
+def formatted(results):
+    results = results.copy()
+    fields = list(zip(results['subject'], results['display_value']))
+    results['label'] = [
+        label.format(subject=subject, value=value)
+        for label, (subject, value) in zip(results['label'], fields)
+    ]
+    results['message'] = [
+        message.format(subject=subject, value=value)
+        for message, (subject, value) in zip(results['message'], fields)
+    ]
+    return results
+
+
+# Formatted (label, message, style) tuples for one section of the results
+def messages(results, section):
+    rows = formatted(results[results['section'] == section])
+    return list(zip(rows['label'], rows['message'], rows['style']))
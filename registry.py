@@ -0,0 +1,231 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import aggregates
+import cohort
+import dataset
+import schema
+import store
+
+# Process-wide registry of loaded student datasets.
+#
+# Datasets are immutable once published and their rows are memory-mapped
+# from the store's snapshot files (see store.py), so every session in this
+# process, and every other process on the host, shares one copy of them.
+# Each dataset is kept together with the stamp of the snapshot it was loaded
+# from; when a refresh in another process replaces the snapshot, the next
+# get() loads the student again and swaps the reference under a short lock.
+# Sessions that already hold the previous Dataset keep using it undisturbed.
+#
+# The registry ingests the data directory once when it is created, so the
+# first request of a server process waits for that. After that,
+# start_watching() runs a daemon thread that polls the data directory's file
+# signatures and, once a changed export has stopped changing, ingests it and
+# loads the new datasets of already-loaded students before publishing them,
+# so later requests never wait on parsing or aggregation. When a student
+# only gained new test days, their loaded dataset is extended with the new
+# rows (Dataset.extend) instead of being rebuilt from the whole history, as
+# long as it was loaded from the snapshot those rows were appended to.
+#
+# The registry also owns the cohort index (see cohort.py). It is built on a
+# background thread the first time it is asked for, from every student in
+# the store, and refreshes update only the students that changed.
+
+# Seconds between polls of the data directory (0 disables the watcher)
+WATCH_INTERVAL = float(os.environ.get("STUDENT_DASHBOARD_WATCH_INTERVAL", "10"))
+
+logger = logging.getLogger(__name__)
+
+
+class DatasetRegistry:
+    def __init__(self, data_dir=store.DATA_DIR, store_dir=store.STORE_DIR, max_students=32):
+        self.data_dir = data_dir
+        self.store_dir = store_dir
+        self.max_students = max_students
+        # student -> (snapshot stamp, Dataset)
+        self._datasets = OrderedDict()
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+        self._signature = store.source_signature(data_dir)
+        self.manifest = store.ingest_directory(data_dir, store_dir)
+        self.checked_at = self.refreshed_at = time.time()
+        self.refreshing = False
+        self.last_error = None
+        self._cohort = None
+        self._cohort_lock = threading.Lock()
+        self._cohort_started = False
+
+    def students(self):
+        return sorted(self.manifest['students'])
+
+    def get(self, student):
+        stamp = store.snapshot_stamp(student, self.store_dir)
+        with self._lock:
+            entry = self._datasets.get(student)
+            if entry is not None and entry[0] == stamp:
+                self._datasets.move_to_end(student)
+                return entry[1]
+
+        loaded = dataset.Dataset(store.read_student(student, store_dir=self.store_dir))
+        with self._lock:
+            # Another session may have published the same snapshot meanwhile
+            entry = self._datasets.get(student)
+            if entry is not None and entry[0] == stamp:
+                loaded = entry[1]
+            else:
+                self._datasets[student] = (stamp, loaded)
+            self._datasets.move_to_end(student)
+            while len(self._datasets) > self.max_students:
+                self._datasets.popitem(last=False)
+        return loaded
+
+    # The cohort index, or None while it is still being built
+    def cohort(self):
+        if self._cohort is None and not self._cohort_started:
+            self._cohort_started = True
+            threading.Thread(target=self._build_cohort, name="cohort-index", daemon=True).start()
+        return self._cohort
+
+    def _student_cube(self, student):
+        with self._lock:
+            entry = self._datasets.get(student)
+        if entry is not None and entry[0] == store.snapshot_stamp(student, self.store_dir):
+            return entry[1].cube
+        return aggregates.build_cube(store.read_student(student, store_dir=self.store_dir))
+
+    def _build_cohort(self):
+        # Held so a refresh running meanwhile applies its changes afterwards
+        with self._cohort_lock:
+            try:
+                self._cohort = cohort.CohortIndex.from_cubes(
+                    {student: self._student_cube(student) for student in self.students()}
+                )
+            except Exception:
+                logger.exception("building the cohort index failed")
+                self._cohort_started = False
+
+    def _update_cohort(self, changes):
+        with self._cohort_lock:
+            if self._cohort is None:
+                return
+            for student, (change, _) in changes.items():
+                if change == 'removed':
+                    self._cohort.remove(student)
+                else:
+                    self._cohort.update(student, self._student_cube(student))
+
+    # Bytes held by each loaded dataset (rows plus aggregate cube); the rows
+    # are memory-mapped and shared with every other process on the host
+    def memory_usage(self):
+        with self._lock:
+            loaded = {student: data for student, (_, data) in self._datasets.items()}
+        return {
+            student: schema.memory_usage(data.frame) + schema.memory_usage(data.cube)
+            for student, data in loaded.items()
+        }
+
+    # Pick up new or changed exports. Returns the changes, or None when another
+    # refresh is already running (callers are never queued behind it).
+    def refresh(self):
+        if not self._refresh_lock.acquire(blocking=False):
+            return None
+        self.refreshing = True
+        try:
+            # Taken first, so an export changing during the sync is seen again
+            signature = store.source_signature(self.data_dir)
+            manifest, changes = store.sync_directory(self.data_dir, self.store_dir)
+            with self._lock:
+                loaded = [student for student in changes if student in self._datasets]
+            for student in loaded:
+                self._reload(student, *changes[student])
+            self.manifest = manifest
+            self._update_cohort(changes)
+            self._signature = signature
+            self.refreshed_at = time.time()
+            self.last_error = None
+            return changes
+        except Exception as error:
+            self.last_error = f"{type(error).__name__}: {error}"
+            raise
+        finally:
+            self.refreshing = False
+            self._refresh_lock.release()
+
+    # Start a refresh on its own thread; False if one is already running
+    def refresh_in_background(self):
+        if self.refreshing:
+            return False
+        threading.Thread(target=self._refresh_logged, name="dataset-refresh", daemon=True).start()
+        return True
+
+    def _refresh_logged(self):
+        try:
+            changes = self.refresh()
+        except Exception:
+            logger.exception("background refresh failed")
+            return
+        if changes:
+            logger.info("refreshed %d student(s): %s", len(changes), ", ".join(sorted(changes)))
+
+    # Build a changed student's new Dataset here, then publish it in one swap
+    def _reload(self, student, change, base=None):
+        updated = None
+        if change != 'removed':
+            stamp = store.snapshot_stamp(student, self.store_dir)
+            frame = store.read_student(student, store_dir=self.store_dir)
+            with self._lock:
+                entry = self._datasets.get(student)
+            # Only rows of later days were added to the snapshot this dataset
+            # was loaded from (an older one may have had different history)
+            if change == 'appended' and entry is not None and entry[0] == base:
+                updated = (stamp, entry[1].extend(frame))
+            else:
+                updated = (stamp, dataset.Dataset(frame))
+        with self._lock:
+            if updated is None:
+                self._datasets.pop(student, None)
+            elif student in self._datasets:
+                self._datasets[student] = updated
+
+    def start_watching(self, interval=WATCH_INTERVAL):
+        if interval <= 0 or self._watcher is not None:
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(
+            target=self._watch, args=(interval,), name="dataset-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def _watch(self, interval):
+        settling = None
+        while not self._stop.wait(interval):
+            signature = store.source_signature(self.data_dir)
+            self.checked_at = time.time()
+            if signature == self._signature:
+                settling = None
+            elif signature != settling:
+                # Changed since the last poll: wait until the exports stop
+                # changing so half-written files are not ingested
+                settling = signature
+            else:
+                self._refresh_logged()
+
+    def status(self):
+        return {
+            'watching': self._watcher is not None,
+            'refreshing': self.refreshing,
+            'checked_at': self.checked_at,
+            'refreshed_at': self.refreshed_at,
+            'error': self.last_error,
+        }
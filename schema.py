@@ -0,0 +1,101 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+# In-memory schema of the test results.
+#
+# Whatever produced the rows (openpyxl gives float64 counts and object
+# strings), normalize() casts them once to the compact layout every later
+# stage relies on: a datetime64 date, a categorical subject, int16 counts and
+# float32 marks and rates. The same dtypes are written to the store, so every
+# memory-mapped snapshot of a student is used without conversion.
+# Values that would not survive the cast (fractional or out-of-range counts,
+# unparseable dates) raise SchemaError instead of being silently wrapped.
+
+COLUMNS = ['date', 'subject', 'no_of_questions', 'correct',
+           'incorrect', 'unattempted', 'marks', 'total',
+           'percentage', '30_mark_scale', 'accuracy_rate',
+           'attempt_rate', 'penalty_rate']
+
+# Per-test counts: int16 holds any realistic paper (up to 32767 questions)
+COUNT_COLUMNS = ['no_of_questions', 'correct', 'incorrect', 'unattempted', 'total']
+COUNT_DTYPE = 'int16'
+# Scores and rates only need ~7 significant digits
+FLOAT_COLUMNS = ['marks', 'percentage', '30_mark_scale', 'accuracy_rate',
+                 'attempt_rate', 'penalty_rate']
+FLOAT_DTYPE = 'float32'
+DATE_DTYPE = 'datetime64[ns]'
+
+COLUMN_DTYPES = {
+    'subject': 'category',
+    **dict.fromkeys(COUNT_COLUMNS, COUNT_DTYPE),
+    **dict.fromkeys(FLOAT_COLUMNS, FLOAT_DTYPE),
+}
+
+logger = logging.getLogger(__name__)
+
+
+class SchemaError(ValueError):
+    pass
+
+
+def _check_counts(df):
+    limits = np.iinfo(COUNT_DTYPE)
+    for column in COUNT_COLUMNS:
+        values = pd.to_numeric(df[column]).to_numpy(dtype='float64')
+        if np.isnan(values).any():
+            raise SchemaError(f"{column} has missing values")
+        if (values != np.round(values)).any():
+            raise SchemaError(f"{column} has non-integer values")
+        if len(values) and (values.min() < limits.min or values.max() > limits.max):
+            raise SchemaError(f"{column} is outside the {COUNT_DTYPE} range")
+
+
+def _normalize_dates(dates):
+    if len(dates) and not pd.api.types.is_datetime64_any_dtype(dates):
+        raise SchemaError(f"date must be datetime64, got {dates.dtype}")
+    if dates.isna().any():
+        raise SchemaError("date has missing values")
+    return dates.astype(DATE_DTYPE)
+
+
+# Rows cast to the compact schema, with a fresh RangeIndex
+def normalize(df):
+    missing = [column for column in COLUMNS if column not in df.columns]
+    if missing:
+        raise SchemaError(f"missing columns: {', '.join(missing)}")
+
+    df = df[COLUMNS]
+    if len(df):
+        _check_counts(df)
+    df = df.astype(COLUMN_DTYPES)
+    df['date'] = _normalize_dates(df['date'])
+    return df.reset_index(drop=True)
+
+
+def memory_usage(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def memory_report(before, after):
+    before_bytes = memory_usage(before)
+    after_bytes = memory_usage(after)
+    return {
+        'rows': len(after),
+        'before_bytes': before_bytes,
+        'after_bytes': after_bytes,
+        'saved_bytes': before_bytes - after_bytes,
+        'saved_ratio': 1 - after_bytes / before_bytes if before_bytes else 0.0,
+    }
+
+
+# normalize(), logging how much memory the compact schema saved
+def normalize_with_report(df, label=''):
+    normalized = normalize(df)
+    report = memory_report(df, normalized)
+    logger.info(
+        "%s: %d rows, %.1f KiB -> %.1f KiB (%.0f%% saved)", label or 'rows', report['rows'],
+        report['before_bytes'] / 1024, report['after_bytes'] / 1024, report['saved_ratio'] * 100,
+    )
+    return normalized, report
@@ -0,0 +1,347 @@
+import glob
+import json
+import logging
+import os
+import re
+import shutil
+
+import pandas as pd
+
+import data_store
+import ingest
+import schema
+
+# Per-student on-disk store for a whole cohort.
+#
+# A data directory holds one export per student (`<student>.xlsx`, or .csv,
+# .parquet, .json; see ingest.py) or one folder per student with any number
+# of exports (`<student>/*.xlsx`). ingest_directory() reads every changed
+# export concurrently and combines each student's rows into
+#
+#     STORE_DIR/student=<id>/snapshot.arrow
+#
+# plus a manifest.json recording which source files (and which versions of
+# them) each student was built from and how much memory the compact schema
+# saved on their rows, and a rejected.csv per student listing
+# the rows that failed validation and why. A dashboard session only
+# memory-maps the snapshot of the student it shows, so per-session memory and
+# load time do not grow with the size of the cohort.
+#
+# The snapshot holds all of a student's rows, date-sorted, as one contiguous
+# record batch. read_student() memory-maps it and hands out pandas columns
+# that point straight into the mapping, so every session and every process
+# on the host reads the same page-cache pages without copying (the columns
+# are read-only). Snapshots are replaced with an atomic rename; readers that
+# mapped the previous file keep it until they let go, and snapshot_stamp()
+# tells them a newer one exists.
+#
+# The store is partitioned by student only, not by student and month.
+# Month partitions (student=<id>/month=<YYYY-MM>/) were the first layout, but
+# nothing reads a single month: the dashboard, the batch reports and the API
+# all start from a student's whole history (trends, first-to-last
+# improvement, date ranges are filtered in memory), so every load
+# concatenated all of a student's months. One snapshot per student makes a
+# load a single memory map, and it is the per-student read, not the month
+# split, that keeps per-session memory and load time flat as the cohort grows.
+#
+# The snapshot is the only per-student copy of the rows. The per-export cache
+# under data_store.CACHE_DIR is a different thing: it is keyed by source
+# file, so when one of a student's exports changes only that export is parsed
+# and validated again, and the others (and their rejected rows) are read back
+# from their Arrow files.
+#
+# A changed export is always read and validated as a whole: new test days
+# can only be found by parsing the file. Exports usually change by gaining
+# new test days, though, and when a student's history up to the recorded
+# date watermark is unchanged, sync_directory() only validates that
+# history against its content hash and folds the rows after the watermark
+# into a new snapshot (append_student) instead of rebuilding the student.
+# Writing the snapshot whole keeps it one contiguous mapping that every
+# reader shares; the copy it takes is made once, in the ingesting process.
+
+# Exports live in their own directory, so nothing else in the working
+# directory (benchmark results, batch reports, the cache) is mistaken for a
+# student
+DATA_DIR = os.environ.get("STUDENT_DASHBOARD_DATA_DIR", "data")
+STORE_DIR = os.path.join(data_store.CACHE_DIR, "store")
+MANIFEST_VERSION = 3
+SNAPSHOT_FILE = "snapshot.arrow"
+REJECTED_FILE = "rejected.csv"
+
+logger = logging.getLogger(__name__)
+
+
+def student_id_for(source_path, data_dir=DATA_DIR):
+    parts = os.path.relpath(source_path, data_dir).split(os.sep)
+    name = parts[0] if len(parts) > 1 else os.path.splitext(parts[0])[0]
+    return re.sub(r'[^\w.-]+', '_', name)
+
+
+# student id -> sorted source paths
+def discover_sources(data_dir=DATA_DIR):
+    sources = {}
+    for pattern in ingest.patterns():
+        paths = glob.glob(os.path.join(data_dir, pattern))
+        paths += glob.glob(os.path.join(data_dir, '*', pattern))
+        for path in paths:
+            # Skip the lock files Excel leaves next to open workbooks
+            if os.path.basename(path).startswith('~$'):
+                continue
+            sources.setdefault(student_id_for(path, data_dir), []).append(path)
+    return {student: sorted(paths) for student, paths in sorted(sources.items())}
+
+
+# Cheap fingerprint of the data directory (paths, mtimes and sizes) for
+# polling: it changes whenever an export is added, removed or rewritten
+def source_signature(data_dir=DATA_DIR):
+    signature = {}
+    for paths in discover_sources(data_dir).values():
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            signature[path] = (stat.st_mtime_ns, stat.st_size)
+    return signature
+
+
+def _manifest_path(store_dir):
+    return os.path.join(store_dir, 'manifest.json')
+
+
+def load_manifest(store_dir=STORE_DIR):
+    try:
+        with open(_manifest_path(store_dir)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = None
+    if not manifest or manifest.get('version') != MANIFEST_VERSION:
+        return {'version': MANIFEST_VERSION, 'students': {}}
+    return manifest
+
+
+def save_manifest(manifest, store_dir=STORE_DIR):
+    os.makedirs(store_dir, exist_ok=True)
+    tmp_path = f"{_manifest_path(store_dir)}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, _manifest_path(store_dir))
+
+
+def student_dir(student, store_dir=STORE_DIR):
+    return os.path.join(store_dir, f"student={student}")
+
+
+def snapshot_path(student, store_dir=STORE_DIR):
+    return os.path.join(student_dir(student, store_dir), SNAPSHOT_FILE)
+
+
+# Identifies the current snapshot file; changes whenever it is replaced
+def snapshot_stamp(student, store_dir=STORE_DIR):
+    try:
+        stat = os.stat(snapshot_path(student, store_dir))
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def _write_snapshot(df, path, student):
+    rows = df.sort_values('date', kind='stable', ignore_index=True)
+    data_store.write_cache(rows, path, {'student': student, 'snapshot': True})
+
+
+def _is_current(entry, paths):
+    return (
+        entry is not None
+        and sorted(entry['sources']) == paths
+        and all(data_store.key_matches(path, entry['sources'][path]) for path in paths)
+    )
+
+
+# Order-independent content hash of a frame's rows
+def frame_hash(df):
+    return format(int(pd.util.hash_pandas_object(df, index=False).sum()), 'x')
+
+
+# Rows and rejected rows of one student from its loaded exports; re-raises
+# the first error any of them failed with
+def _combine(loaded):
+    for result in loaded:
+        if isinstance(result, Exception):
+            raise result
+    frames = [rows for rows, _ in loaded]
+    rejected = pd.concat([rejected for _, rejected in loaded], ignore_index=True)
+    if len(frames) == 1:
+        return frames[0], rejected
+    # Re-apply the cache dtypes: concat widens differing categoricals to object
+    return schema.normalize(pd.concat(frames, ignore_index=True)), rejected
+
+
+def rejected_path(student, store_dir=STORE_DIR):
+    return os.path.join(student_dir(student, store_dir), REJECTED_FILE)
+
+
+def _write_rejected(rejected, student, store_dir):
+    path = rejected_path(student, store_dir)
+    if rejected.empty:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    reasons = ingest.reason_counts(rejected)
+    # Placeholders for tests not taken yet are expected, anything else is not
+    level = logging.INFO if set(reasons) == {ingest.NOT_TAKEN} else logging.WARNING
+    logger.log(level, "%s: %d rows rejected (%s), see %s", student, len(rejected),
+               ", ".join(f"{reason}: {count}" for reason, count in reasons.items()), path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    rejected.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def write_student(df, student, store_dir=STORE_DIR):
+    final_dir = student_dir(student, store_dir)
+    staging_dir = f"{final_dir}.{os.getpid()}.staging"
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    _write_snapshot(df, os.path.join(staging_dir, SNAPSHOT_FILE), student)
+
+    # Swap the new snapshot in; open memory maps of the old file stay valid
+    retired_dir = f"{final_dir}.{os.getpid()}.retired"
+    if os.path.exists(final_dir):
+        os.rename(final_dir, retired_dir)
+    os.makedirs(staging_dir, exist_ok=True)
+    os.rename(staging_dir, final_dir)
+    shutil.rmtree(retired_dir, ignore_errors=True)
+
+
+# Fold rows dated after everything stored so far into a new snapshot,
+# replaced atomically; the history is read from the current mapping
+def append_student(rows, student, store_dir=STORE_DIR):
+    if rows.empty:
+        return
+    history = read_student(student, store_dir=store_dir)
+    # The appended rows are all newer, so the snapshot stays date-sorted
+    _write_snapshot(schema.normalize(pd.concat([history, rows], ignore_index=True)),
+                    snapshot_path(student, store_dir), student)
+
+
+# Rows after the watermark, or None when earlier history changed as well
+def _new_rows(df, entry):
+    if entry is None or not entry.get('last_date'):
+        return None
+    is_new = df['date'] > pd.Timestamp(entry['last_date'])
+    if frame_hash(df[~is_new]) != entry.get('content_hash'):
+        return None
+    return df[is_new]
+
+
+def _last_date(df):
+    return df['date'].max().isoformat() if len(df) else None
+
+
+# Memory the compact schema saved on a student's rows, summed over its exports
+def _memory(paths):
+    reports = [data_store.memory_report_for(path) for path in paths]
+    before = sum(report['before_bytes'] for report in reports if report)
+    after = sum(report['after_bytes'] for report in reports if report)
+    return {
+        'before_bytes': before,
+        'after_bytes': after,
+        'saved_ratio': 1 - after / before if before else 0.0,
+    }
+
+
+# Bring the store up to date with the data directory. Returns the manifest and
+# {student: (change, base)} where change is one of 'appended', 'rewritten' or
+# 'removed', and base is the snapshot_stamp() of the snapshot that rows were
+# appended to (None otherwise): only a dataset loaded from that snapshot has
+# the history the new rows continue.
+def sync_directory(data_dir=DATA_DIR, store_dir=STORE_DIR):
+    manifest = load_manifest(store_dir)
+    sources = discover_sources(data_dir)
+    changes = {}
+
+    stale = {
+        student: paths for student, paths in sources.items()
+        if not _is_current(manifest['students'].get(student), paths)
+    }
+    # Every changed export is read and validated at once; exports that did
+    # not change come back from the per-export cache
+    loaded = ingest.load_files(
+        [path for paths in stale.values() for path in paths], load=data_store.load_dataset
+    )
+
+    for student, paths in stale.items():
+        entry = manifest['students'].get(student)
+        try:
+            df, rejected = _combine([loaded[path] for path in paths])
+        except schema.SchemaError as error:
+            # Keep serving what was stored before rather than failing the sync
+            logger.error("%s: export does not match the schema: %s", student, error)
+            continue
+        except Exception as error:
+            # Unreadable (e.g. still being written); retried on the next sync
+            logger.error("%s: could not read export: %s", student, error)
+            continue
+        source_keys = {path: data_store.source_key(path) for path in paths}
+        new_rows = _new_rows(df, entry)
+
+        if new_rows is not None:
+            base = snapshot_stamp(student, store_dir)
+            append_student(new_rows, student, store_dir)
+            entry.update({
+                'sources': source_keys,
+                'rows': entry['rows'] + len(new_rows),
+                'rejected': len(rejected),
+                'last_date': _last_date(df),
+                'content_hash': frame_hash(df),
+                'memory': _memory(paths),
+            })
+            _write_rejected(rejected, student, store_dir)
+            # An export rewritten without new test days leaves the snapshot as is
+            if not new_rows.empty:
+                changes[student] = ('appended', base)
+            continue
+
+        write_student(df, student, store_dir)
+        manifest['students'][student] = {
+            'sources': source_keys,
+            'rows': len(df),
+            'rejected': len(rejected),
+            'last_date': _last_date(df),
+            'content_hash': frame_hash(df),
+            'memory': _memory(paths),
+        }
+        _write_rejected(rejected, student, store_dir)
+        changes[student] = ('rewritten', None)
+
+    # Students whose exports were removed disappear from the store
+    for student in set(manifest['students']) - set(sources):
+        shutil.rmtree(student_dir(student, store_dir), ignore_errors=True)
+        del manifest['students'][student]
+        changes[student] = ('removed', None)
+
+    save_manifest(manifest, store_dir)
+    return manifest, changes
+
+
+def ingest_directory(data_dir=DATA_DIR, store_dir=STORE_DIR):
+    manifest, _ = sync_directory(data_dir, store_dir)
+    return manifest
+
+
+def list_students(store_dir=STORE_DIR):
+    return sorted(load_manifest(store_dir)['students'])
+
+
+# Rows of one student, memory-mapped zero-copy from the snapshot
+def read_student(student, store_dir=STORE_DIR):
+    return _sorted_subjects(
+        data_store.read_table(snapshot_path(student, store_dir)).to_pandas(split_blocks=True)
+    )
+
+
+# Snapshots carry their own dictionaries; keep subjects in sorted order
+def _sorted_subjects(df):
+    categories = list(df['subject'].cat.categories)
+    if categories != sorted(categories):
+        df['subject'] = df['subject'].cat.set_categories(sorted(categories))
+    return df
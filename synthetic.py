@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+import schema
+import store
+
+# Synthetic test histories for benchmarking.
+#
+# generate() produces rows in exactly the schema and dtypes the store serves
+# (see schema.py), with the same derived columns as the real exports:
+# marks = correct - incorrect / 3, percentage = marks / total, and the rates
+# relative to no_of_questions. Output depends only on the seed.
+
+SUBJECTS = ['Physics', 'Chemistry', 'Biology']
+START_DATE = '2000-01-01'
+# Longest history generated; bigger sizes get several tests per day instead
+MAX_DAYS = 20 * 365
+
+
+def generate(rows, seed=0, start=START_DATE, subjects=SUBJECTS, max_days=MAX_DAYS):
+    rng = np.random.default_rng(seed)
+    rows = int(rows)
+    days = max(min(-(-rows // len(subjects)), max_days), 1)
+
+    day = np.sort(rng.integers(0, days, rows))
+    subject = np.resize(np.arange(len(subjects)), rows)
+
+    questions = rng.integers(15, 101, rows)
+    # Each student drifts slowly between ~55% and ~95% ability
+    ability = 0.75 + 0.2 * np.sin(day / max(days, 1) * 2 * np.pi + seed)
+    attempted = np.minimum(rng.binomial(questions, 0.92), questions)
+    correct = rng.binomial(attempted, np.clip(ability + rng.normal(0, 0.05, rows), 0.05, 1))
+    incorrect = attempted - correct
+    unattempted = questions - attempted
+    marks = correct - incorrect / 3
+    percentage = marks / questions * 100
+
+    df = pd.DataFrame({
+        'date': pd.Timestamp(start) + pd.to_timedelta(day, unit='D'),
+        'subject': pd.Categorical.from_codes(subject, categories=subjects),
+        'no_of_questions': questions,
+        'correct': correct,
+        'incorrect': incorrect,
+        'unattempted': unattempted,
+        'marks': marks,
+        'total': questions,
+        'percentage': percentage,
+        '30_mark_scale': percentage * 0.3,
+        'accuracy_rate': correct / questions,
+        'attempt_rate': attempted / questions,
+        'penalty_rate': incorrect / questions,
+    })
+    return schema.normalize(df[schema.COLUMNS])
+
+
+def student_id(index):
+    return f"synthetic-{index:04d}"
+
+
+# Write `students` synthetic students straight into a store directory
+def populate_store(store_dir, students, rows_per_student, seed=0):
+    manifest = store.load_manifest(store_dir)
+    ids = []
+    for index in range(students):
+        student = student_id(index)
+        df = generate(rows_per_student, seed=seed + index)
+        store.write_student(df, student, store_dir)
+        manifest['students'][student] = {
+            'sources': {},
+            'rows': len(df),
+            'last_date': df['date'].max().isoformat(),
+            'content_hash': store.frame_hash(df),
+        }
+        ids.append(student)
+    store.save_manifest(manifest, store_dir)
+    return ids
+
+
+# Workbook in the export layout (dd-mm-yyyy dates), for timing the xlsx parse
+def write_workbook(df, path):
+    export = df.astype({'subject': str})
+    export['date'] = export['date'].dt.strftime('%d-%m-%Y')
+    export.to_excel(path, index=False)
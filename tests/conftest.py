@@ -0,0 +1,48 @@
+import itertools
+import os
+import sys
+
+import pytest
+
+# The modules live at the top of the repository, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import synthetic  # noqa: E402
+
+
+# Runs the test in its own directory: the per-export cache goes to .cache/
+# under the working directory
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+# function(student, rows or frame, seed=0) writing a CSV export into
+# workdir/data and returning the rows it holds
+@pytest.fixture
+def write_export(workdir):
+    data_dir = workdir / 'data'
+    data_dir.mkdir()
+    writes = itertools.count(1)
+
+    def write(student, rows, seed=0):
+        df = synthetic.generate(rows, seed=seed) if isinstance(rows, int) else rows
+        path = data_dir / f"{student}.csv"
+        df.to_csv(path, index=False)
+        # Every write gets a later mtime, even within the filesystem's
+        # timestamp resolution, so a same-sized rewrite still looks changed
+        mtime_ns = os.stat(path).st_mtime_ns + next(writes) * 1_000_000_000
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+        return df
+    return write
+
+
+@pytest.fixture
+def data_dir(workdir):
+    return str(workdir / 'data')
+
+
+@pytest.fixture
+def store_dir(workdir):
+    return str(workdir / 'store')
@@ -0,0 +1,112 @@
+import http.client
+import json
+import threading
+
+import pytest
+
+import api
+import query
+import registry
+
+
+@pytest.fixture
+def server(write_export, data_dir, store_dir):
+    write_export('alice', 300, seed=1)
+    write_export('bob', 300, seed=2)
+    engine = query.QueryEngine(registry.DatasetRegistry(data_dir, store_dir))
+    server = api.make_server(engine, port=0)
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+# function(method, path, body=None, headers={}) -> (status, headers, JSON or None)
+@pytest.fixture
+def request_(server):
+    def send(method, path, body=None, headers=None):
+        connection = http.client.HTTPConnection(*server.server_address[:2], timeout=10)
+        try:
+            connection.request(method, path, body=body, headers=headers or {})
+            response = connection.getresponse()
+            payload = response.read()
+            return response.status, response.headers, json.loads(payload) if payload else None
+        finally:
+            connection.close()
+    return send
+
+
+def test_students(request_):
+    status, _, body = request_('GET', '/students')
+
+    assert status == 200
+    assert body == {'students': ['alice', 'bob']}
+
+
+def test_query_sends_an_etag_and_answers_304_when_unchanged(request_):
+    path = '/subjects?student=alice&start=2000-01-10&end=2000-03-01'
+    status, headers, body = request_('GET', path)
+
+    assert status == 200
+    assert {row['subject'] for row in body['subjects']} == {'Biology', 'Chemistry', 'Physics'}
+    etag = headers['ETag']
+
+    status, headers, body = request_('GET', path, headers={'If-None-Match': etag})
+    assert (status, headers['ETag'], body) == (304, etag, None)
+
+    # A different selection is a different resource
+    status, headers, _ = request_('GET', path + '&subject=Physics', headers={'If-None-Match': etag})
+    assert status == 200
+    assert headers['ETag'] != etag
+
+
+@pytest.mark.parametrize('path, message', [
+    ('/summary?student=carol', "unknown student: 'carol'"),
+    ('/summary', 'unknown student: None'),
+    ('/trend?student=alice&start=01-02-2000', "invalid date: '01-02-2000' (expected YYYY-MM-DD)"),
+    ('/trend?student=alice&start=2000-03-01&end=2000-02-01', 'start 2000-03-01 is after end 2000-02-01'),
+    ('/recent?student=alice&subject=Music', "unknown subject: 'Music'"),
+    ('/recent?student=alice&start=2030-01-01', 'no tests match the selected dates and subject'),
+])
+def test_bad_queries_are_400(request_, path, message):
+    status, _, body = request_('GET', path)
+
+    assert (status, body) == (400, {'error': message})
+
+
+@pytest.mark.parametrize('method, path', [('GET', '/nothing'), ('GET', '/'), ('POST', '/summary')])
+def test_unknown_endpoints_are_404(request_, method, path):
+    status, _, body = request_(method, path, body=b'{}' if method == 'POST' else None)
+
+    assert status == 404
+    assert body['error'].startswith('unknown endpoint')
+
+
+def test_batch_reports_failures_in_place(request_):
+    queries = [
+        {'query': 'summary', 'student': 'alice'},
+        {'query': 'trend', 'student': 'carol'},
+        {'query': 'nothing', 'student': 'bob'},
+    ]
+    status, _, body = request_('POST', '/batch', body=json.dumps({'queries': queries}))
+
+    assert status == 200
+    assert body[0]['ok'] and body[0]['result']['tests'] > 0
+    assert body[1:] == [
+        {'ok': False, 'error': "unknown student: 'carol'"},
+        {'ok': False, 'error': "unknown query: 'nothing'"},
+    ]
+
+
+@pytest.mark.parametrize('body, message', [
+    (b'{not json', None),
+    (b'{"queries": {"query": "summary"}}', 'batch body must be a JSON list of queries'),
+])
+def test_malformed_batches_are_400(request_, body, message):
+    status, _, response = request_('POST', '/batch', body=body)
+
+    assert status == 400
+    if message:
+        assert response == {'error': message}
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import aggregates
+import cohort
+import synthetic
+
+
+def _cube(seed, rows=90):
+    return aggregates.build_cube(synthetic.generate(rows, seed=seed, max_days=30))
+
+
+# Standing of `score` among `scores`, computed the slow way
+def _expected(scores, score):
+    scores = np.asarray(scores)
+    below, at = (scores < score).sum(), (scores == score).sum()
+    return {
+        'percentile': (below + at / 2) / len(scores) * 100,
+        'rank': (scores > score).sum() + 1,
+        'size': len(scores),
+    }
+
+
+def _assert_standings(index, cubes):
+    scores = {student: cohort.student_scores(cube) for student, cube in cubes.items()}
+    keys = set().union(*(student_scores.keys() for student_scores in scores.values()))
+    assert len(index) == len(cubes)
+    for key in keys:
+        cohort_scores = [student_scores[key] for student_scores in scores.values() if key in student_scores]
+        assert index.size(key) == len(cohort_scores)
+        for student, student_scores in scores.items():
+            standing = index.student_standing(student, key)
+            if key not in student_scores:
+                assert standing is None
+                continue
+            expected = _expected(cohort_scores, student_scores[key])
+            assert standing['percentile'] == pytest.approx(expected['percentile'])
+            assert (standing['rank'], standing['size']) == (expected['rank'], expected['size'])
+
+
+def test_from_cubes_ranks_every_key():
+    cubes = {f"s{i}": _cube(i) for i in range(6)}
+
+    _assert_standings(cohort.CohortIndex.from_cubes(cubes), cubes)
+
+
+def test_updates_match_a_fresh_build():
+    cubes = {f"s{i}": _cube(i) for i in range(6)}
+    index = cohort.CohortIndex()
+    for student, cube in cubes.items():
+        index.update(student, cube)
+
+    _assert_standings(index, cubes)
+
+
+def test_update_replaces_a_students_scores():
+    cubes = {f"s{i}": _cube(i) for i in range(5)}
+    index = cohort.CohortIndex.from_cubes(cubes)
+
+    cubes['s2'] = _cube(42, rows=150)
+    index.update('s2', cubes['s2'])
+
+    _assert_standings(index, cubes)
+
+
+def test_remove_takes_a_student_out_of_every_key():
+    cubes = {f"s{i}": _cube(i) for i in range(5)}
+    index = cohort.CohortIndex.from_cubes(cubes)
+
+    index.remove('s0')
+    index.remove('nobody')
+    del cubes['s0']
+
+    _assert_standings(index, cubes)
+    assert index.student_standing('s0', (None, None)) is None
+
+
+def test_standing_of_known_scores():
+    index = cohort.CohortIndex()
+    date = pd.Timestamp('2025-03-05')
+    for student, percentage in [('a', 50.0), ('b', 70.0), ('c', 70.0), ('d', 90.0)]:
+        cube = pd.DataFrame({
+            'date': [date], 'subject': pd.Categorical(['Physics']), 'n': [1], 'percentage': [percentage],
+        })
+        index.update(student, cube)
+
+    assert index.student_standing('a', ('Physics', None)) == {'percentile': 12.5, 'rank': 4, 'size': 4}
+    assert index.student_standing('b', (None, date)) == {'percentile': 50.0, 'rank': 2, 'size': 4}
+    assert index.student_standing('d', (None, None)) == {'percentile': 87.5, 'rank': 1, 'size': 4}
+    assert index.standing(('Physics', date), 100.0)['rank'] == 1
+    assert index.standing(('Biology', None), 60.0) is None
+    assert index.date_percentiles('a', date, ['Physics', 'Biology'])[0] == 12.5
+    assert np.isnan(index.date_percentiles('a', date, ['Physics', 'Biology'])[1])
+
+
+def test_empty_cubes_are_skipped():
+    empty = _cube(0).iloc[:0]
+    index = cohort.CohortIndex.from_cubes({'a': _cube(1), 'b': empty})
+
+    assert len(index) == 1
+    assert index.student_standing('b', (None, None)) is None
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import dataset
+import metrics
+import schema
+import synthetic
+
+
+def _history(df, days_kept):
+    cut = df['date'].unique()[days_kept - 1]
+    return df[df['date'] <= cut].reset_index(drop=True)
+
+
+def _assert_same_indexes(extended, full):
+    for ours, theirs in [(extended.rows, full.rows), (extended.cells, full.cells)]:
+        np.testing.assert_array_equal(ours.dates, theirs.dates)
+        assert ours.subject_rows.keys() == theirs.subject_rows.keys()
+        for subject in theirs.subject_rows:
+            np.testing.assert_array_equal(ours.subject_rows[subject], theirs.subject_rows[subject])
+            np.testing.assert_array_equal(ours.subject_dates[subject], theirs.subject_dates[subject])
+
+    for name in ['days', 'row_starts', 'cell_starts']:
+        np.testing.assert_array_equal(getattr(extended.days, name), getattr(full.days, name))
+    np.testing.assert_allclose(extended.days.day_sums, full.days.day_sums)
+    assert extended.days.subject_days.keys() == full.days.subject_days.keys()
+    for subject in full.days.subject_days:
+        np.testing.assert_array_equal(extended.days.subject_days[subject], full.days.subject_days[subject])
+
+    assert extended.trends.subjects() == full.trends.subjects()
+    np.testing.assert_allclose(extended.trends._all.cumulative, full.trends._all.cumulative)
+    for subject in full.trends.subjects():
+        np.testing.assert_allclose(extended.trends._sums(subject).cumulative,
+                                   full.trends._sums(subject).cumulative)
+
+
+def _assert_same_views(extended, full, windows=15, seed=0):
+    rng = np.random.default_rng(seed)
+    days = full.days.days
+    subjects = [None] + list(full.trends.subjects())
+    for _ in range(windows):
+        start, end = sorted(rng.choice(days, 2))
+        subject = subjects[rng.integers(len(subjects))]
+        ours = metrics.build_view(extended, start, end, subject)
+        theirs = metrics.build_view(full, start, end, subject)
+        assert ours.keys() == theirs.keys()
+        for key, value in theirs.items():
+            if isinstance(value, pd.DataFrame):
+                pd.testing.assert_frame_equal(ours[key].reset_index(drop=True), value.reset_index(drop=True))
+            elif isinstance(value, pd.Series):
+                pd.testing.assert_series_equal(ours[key], value)
+            else:
+                assert str(ours[key]) == str(value), key
+
+
+@pytest.mark.parametrize('rows, seed, kept', [(300, 0, 0.5), (3000, 3, 0.9), (3000, 4, 0.2)])
+def test_extend_matches_a_full_build(rows, seed, kept):
+    df = synthetic.generate(rows, seed=seed)
+    days = len(df['date'].unique())
+    old = dataset.Dataset(_history(df, max(int(days * kept), 1)))
+
+    extended = old.extend(df)
+    full = dataset.Dataset(df)
+
+    pd.testing.assert_frame_equal(extended.cube, full.cube)
+    assert extended.version == full.version
+    assert (extended.first_date, extended.last_date) == (full.first_date, full.last_date)
+    _assert_same_indexes(extended, full)
+    _assert_same_views(extended, full, seed=seed)
+
+
+def test_repeated_extends_match_a_full_build():
+    df = synthetic.generate(2000, seed=5)
+    days = len(df['date'].unique())
+    data = dataset.Dataset(_history(df, days // 4))
+    for days_kept in (days // 2, days // 2 + 1, days):
+        data = data.extend(_history(df, days_kept))
+
+    full = dataset.Dataset(df)
+    pd.testing.assert_frame_equal(data.cube, full.cube)
+    assert data.version == full.version
+    _assert_same_indexes(data, full)
+
+
+def test_extend_without_new_rows_keeps_the_version():
+    df = synthetic.generate(500)
+    data = dataset.Dataset(df)
+
+    assert data.extend(df).version == data.version
+
+
+@pytest.mark.parametrize('change', ['same day continued', 'fewer rows', 'new subject'])
+def test_extend_falls_back_to_a_full_build(change):
+    # About a dozen rows per test day
+    df = synthetic.generate(600, seed=1, max_days=50)
+    history = _history(df, len(df['date'].unique()) // 2)
+
+    if change == 'same day continued':
+        # The new rows start on the last day already loaded
+        history = history.iloc[:-1]
+    elif change == 'fewer rows':
+        df = history.iloc[:-5]
+    else:
+        later = df.loc[len(history):].astype({'subject': str})
+        later.loc[later.index[-1], 'subject'] = 'Mathematics'
+        df = schema.normalize(pd.concat([history.astype({'subject': str}), later]))
+    old = dataset.Dataset(history)
+
+    extended = old.extend(df)
+    full = dataset.Dataset(df)
+
+    pd.testing.assert_frame_equal(extended.cube, full.cube)
+    assert extended.version == full.version
+    _assert_same_indexes(extended, full)
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import aggregates
+import downsample
+import synthetic
+
+
+@pytest.mark.parametrize('n, threshold', [(1000, 100), (1000, 3), (101, 50), (10, 9)])
+def test_lttb_keeps_the_endpoints_and_one_point_per_bucket(n, threshold):
+    rng = np.random.default_rng(n)
+    x = np.arange(n) * 86400.0
+    y = rng.normal(size=n).cumsum()
+
+    selected = downsample.lttb(x, y, threshold)
+
+    assert len(selected) == threshold
+    assert (selected[0], selected[-1]) == (0, n - 1)
+    assert (np.diff(selected) > 0).all()
+    # Every interior point comes from its own bucket
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    for i, index in enumerate(selected[1:-1]):
+        assert edges[i] <= index < edges[i + 1]
+
+
+def test_lttb_keeps_the_extremes():
+    y = np.zeros(1000)
+    y[321], y[654] = 50.0, -50.0
+
+    selected = downsample.lttb(np.arange(1000), y, 20)
+
+    assert 321 in selected and 654 in selected
+
+
+@pytest.mark.parametrize('threshold', [2, 0, 500, 1000])
+def test_lttb_returns_everything_when_nothing_to_drop(threshold):
+    np.testing.assert_array_equal(downsample.lttb(np.arange(500), np.arange(500), threshold), np.arange(500))
+
+
+@pytest.mark.parametrize('span_days, resolution', [(30, 'daily'), (180, 'daily'), (181, 'weekly'),
+                                                   (3 * 365, 'weekly'), (3 * 365 + 1, 'monthly')])
+def test_resolution_follows_the_span(span_days, resolution):
+    assert downsample.resolution_for(span_days)[1] == resolution
+
+
+@pytest.mark.parametrize('rows, max_days, max_points', [(600, 150, 400), (20_000, 7300, 50), (3000, 1000, 400)])
+def test_trend_series_caps_points_per_subject(rows, max_days, max_points):
+    cube = aggregates.build_cube(synthetic.generate(rows, max_days=max_days))
+
+    series, resolution = downsample.trend_series(cube, max_points=max_points)
+
+    span = (cube['date'].max() - cube['date'].min()).days
+    assert resolution == downsample.resolution_for(span)[1]
+    counts = series.groupby('subject', observed=True).size()
+    assert (counts <= max_points).all()
+    assert set(counts.index) == set(cube['subject'].unique())
+    # Each subject's line still runs from its first to its last period
+    freq = downsample.resolution_for(span)[0]
+    for subject, subject_rows in series.groupby('subject', observed=True):
+        dates = cube.loc[cube['subject'] == subject, 'date']
+        if freq is not None:
+            dates = dates.dt.to_period(freq).dt.start_time
+        assert subject_rows['date'].iloc[0] == dates.min()
+        assert subject_rows['date'].iloc[-1] == dates.max()
+
+
+def test_trend_series_of_a_short_window_is_exact():
+    cube = aggregates.build_cube(synthetic.generate(300, max_days=100))
+
+    series, resolution = downsample.trend_series(cube)
+
+    assert resolution == 'daily'
+    pd.testing.assert_frame_equal(series, aggregates.subject_date_means(cube, ['percentage', '30_mark_scale']))
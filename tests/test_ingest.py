@@ -0,0 +1,109 @@
+import os
+
+import pandas as pd
+import pytest
+
+import ingest
+import schema
+import store
+
+
+# One raw export row as a test centre writes it; `changes` overrides columns
+def _row(**changes):
+    row = {
+        'date': '05-03-2025', 'subject': 'Physics', 'no_of_questions': 30,
+        'correct': 20, 'incorrect': 6, 'unattempted': 4, 'marks': 18.0, 'total': 30,
+        'percentage': 60.0, '30_mark_scale': 18.0, 'accuracy_rate': 20 / 30,
+        'attempt_rate': 26 / 30, 'penalty_rate': 6 / 30,
+    }
+    row.update(changes)
+    return row
+
+
+def _placeholder():
+    results = ['correct', 'incorrect', 'unattempted'] + schema.FLOAT_COLUMNS
+    return _row(no_of_questions=0, **dict.fromkeys(results, None))
+
+
+def test_valid_rows_pass_with_parsed_values():
+    raw = pd.DataFrame([_row(), _row(date='2025-03-06', subject='Biology')])
+
+    rows, rejected = ingest.validate(raw, 'alice.csv')
+
+    assert rejected.empty
+    assert list(rows['date']) == [pd.Timestamp('2025-03-05'), pd.Timestamp('2025-03-06')]
+    assert list(rows['subject']) == ['Physics', 'Biology']
+    schema.normalize(rows)
+
+
+@pytest.mark.parametrize('changes, reason', [
+    ({'subject': None}, 'missing value'),
+    ({'date': '31-02-2025'}, 'bad date'),
+    ({'correct': 'twenty'}, 'not a number'),
+    ({'correct': 19.5, 'unattempted': 4.5}, 'fractional count'),
+    ({'no_of_questions': 40000, 'unattempted': 39974, 'total': 40000}, 'count out of range'),
+    ({'correct': 21}, 'counts do not add up'),
+    ({'accuracy_rate': 1.5}, 'rate outside [0, 1]'),
+    ({'percentage': 120.0}, 'percentage above 100'),
+])
+def test_invalid_rows_are_rejected_with_the_reason(changes, reason):
+    raw = pd.DataFrame([_row(), _row(**changes)])
+
+    rows, rejected = ingest.validate(raw, 'alice.csv')
+
+    assert len(rows) == 1
+    assert list(rejected.columns) == ingest.REJECTED_COLUMNS
+    assert rejected.loc[0, ['source', 'row', 'reason']].tolist() == ['alice.csv', 1, reason]
+
+
+def test_every_failed_check_is_reported():
+    raw = pd.DataFrame([_row(correct=21, percentage=120.0)])
+
+    _, rejected = ingest.validate(raw)
+
+    assert rejected.loc[0, 'reason'] == 'counts do not add up; percentage above 100'
+
+
+def test_tests_not_taken_are_reported_as_such():
+    raw = pd.DataFrame([_row(), _placeholder(), _row(correct=21)])
+
+    rows, rejected = ingest.validate(raw)
+
+    assert len(rows) == 1
+    assert list(rejected['reason']) == [ingest.NOT_TAKEN, 'counts do not add up']
+    assert ingest.reason_counts(rejected) == {ingest.NOT_TAKEN: 1, 'counts do not add up': 1}
+
+
+def test_missing_columns_reject_the_whole_file():
+    raw = pd.DataFrame([_row()]).drop(columns=['marks', 'total'])
+
+    with pytest.raises(schema.SchemaError, match='missing columns: marks, total'):
+        ingest.validate(raw)
+
+
+def test_dates_are_parsed_day_first_and_to_midnight():
+    parsed = ingest.parse_dates(pd.Series(['01-02-2025', '2025-02-03T14:30:00', 'soon', None]))
+
+    assert parsed.tolist()[:3] == [pd.Timestamp('2025-02-01'), pd.Timestamp('2025-02-03'), pd.NaT]
+    assert pd.isna(parsed.iloc[3])
+
+
+def test_datetime_columns_lose_time_and_time_zone():
+    values = pd.Series(pd.to_datetime(['2025-02-01 23:00', '2025-02-02 08:15']).tz_localize('UTC'))
+
+    assert ingest.parse_dates(values).tolist() == [pd.Timestamp('2025-02-01'), pd.Timestamp('2025-02-02')]
+
+
+def test_rejected_rows_are_written_next_to_the_snapshot(data_dir, store_dir):
+    os.makedirs(data_dir)
+    raw = pd.DataFrame([_row(), _placeholder(), _row(date='someday')])
+    raw.to_csv(os.path.join(data_dir, 'alice.csv'), index=False)
+
+    manifest = store.ingest_directory(data_dir, store_dir)
+
+    assert manifest['students']['alice']['rows'] == 1
+    assert manifest['students']['alice']['rejected'] == 2
+    report = pd.read_csv(store.rejected_path('alice', store_dir))
+    assert list(report['reason']) == [ingest.NOT_TAKEN, 'bad date']
+    assert list(report['row']) == [1, 2]
+    assert (report['source'] == os.path.join(data_dir, 'alice.csv')).all()
@@ -0,0 +1,153 @@
+import os
+
+import pandas as pd
+import pytest
+
+import schema
+import store
+
+
+def _plain(df):
+    return df.astype({'subject': str}).reset_index(drop=True)
+
+
+def _assert_rows(actual, expected):
+    expected = expected.sort_values('date', kind='stable', ignore_index=True)
+    pd.testing.assert_frame_equal(_plain(actual), _plain(expected), check_dtype=False, rtol=1e-6)
+
+
+# (rows up to and including `cut`, rows after it) of a date-sorted frame
+def _split(df, days_kept):
+    cut = df['date'].unique()[days_kept - 1]
+    return df[df['date'] <= cut].reset_index(drop=True), df[df['date'] > cut].reset_index(drop=True)
+
+
+def test_sync_builds_one_snapshot_per_student(write_export, data_dir, store_dir):
+    alice = write_export('alice', 300, seed=1)
+    bob = write_export('bob', 120, seed=2)
+
+    manifest, changes = store.sync_directory(data_dir, store_dir)
+
+    assert changes == {'alice': ('rewritten', None), 'bob': ('rewritten', None)}
+    assert store.list_students(store_dir) == ['alice', 'bob']
+    assert manifest['students']['alice']['rows'] == len(alice)
+    assert manifest['students']['alice']['last_date'] == alice['date'].max().isoformat()
+    _assert_rows(store.read_student('alice', store_dir), alice)
+    _assert_rows(store.read_student('bob', store_dir), bob)
+
+
+def test_unchanged_exports_are_not_synced_again(write_export, data_dir, store_dir):
+    write_export('alice', 300)
+    store.sync_directory(data_dir, store_dir)
+    stamp = store.snapshot_stamp('alice', store_dir)
+
+    _, changes = store.sync_directory(data_dir, store_dir)
+
+    assert changes == {}
+    assert store.snapshot_stamp('alice', store_dir) == stamp
+
+
+def test_new_test_days_are_appended(write_export, data_dir, store_dir):
+    df = write_export('alice', 300)
+    history, _ = _split(df, 60)
+    write_export('alice', history)
+    store.sync_directory(data_dir, store_dir)
+    stamp = store.snapshot_stamp('alice', store_dir)
+
+    write_export('alice', df)
+    manifest, changes = store.sync_directory(data_dir, store_dir)
+
+    assert changes == {'alice': ('appended', stamp)}
+    assert store.snapshot_stamp('alice', store_dir) != stamp
+    assert manifest['students']['alice']['rows'] == len(df)
+    _assert_rows(store.read_student('alice', store_dir), df)
+
+
+def test_appends_are_compacted_into_the_snapshot(write_export, data_dir, store_dir):
+    df = write_export('alice', 300)
+    days = len(df['date'].unique())
+    for days_kept in (days // 3, days // 2, days - 1, days):
+        write_export('alice', _split(df, days_kept)[0])
+        _, changes = store.sync_directory(data_dir, store_dir)
+
+    assert changes['alice'][0] == 'appended'
+    # No side files: every append was folded into the one snapshot
+    assert os.listdir(store.student_dir('alice', store_dir)) == [store.SNAPSHOT_FILE]
+    _assert_rows(store.read_student('alice', store_dir), df)
+
+
+def test_rewrite_without_new_days_keeps_the_snapshot(write_export, data_dir, store_dir):
+    df = write_export('alice', 300)
+    store.sync_directory(data_dir, store_dir)
+    stamp = store.snapshot_stamp('alice', store_dir)
+
+    # The same rows plus one that fails validation
+    bad = df.iloc[:1].assign(correct=-1)
+    write_export('alice', pd.concat([df, bad], ignore_index=True))
+    manifest, changes = store.sync_directory(data_dir, store_dir)
+
+    assert changes == {}
+    assert store.snapshot_stamp('alice', store_dir) == stamp
+    assert manifest['students']['alice']['rejected'] == 1
+    assert os.path.exists(store.rejected_path('alice', store_dir))
+
+
+def test_changed_history_rewrites_the_student(write_export, data_dir, store_dir):
+    df = write_export('alice', 300)
+    store.sync_directory(data_dir, store_dir)
+
+    changed = df.copy()
+    changed.loc[0, 'marks'] -= 1
+    write_export('alice', changed)
+    _, changes = store.sync_directory(data_dir, store_dir)
+
+    assert changes == {'alice': ('rewritten', None)}
+    _assert_rows(store.read_student('alice', store_dir), changed)
+
+
+def test_removed_exports_leave_the_store(write_export, data_dir, store_dir):
+    write_export('alice', 100)
+    write_export('bob', 100)
+    store.sync_directory(data_dir, store_dir)
+
+    os.remove(os.path.join(data_dir, 'bob.csv'))
+    _, changes = store.sync_directory(data_dir, store_dir)
+
+    assert changes == {'bob': ('removed', None)}
+    assert store.list_students(store_dir) == ['alice']
+    assert not os.path.exists(store.student_dir('bob', store_dir))
+
+
+def test_unreadable_export_keeps_the_stored_student(write_export, data_dir, store_dir):
+    df = write_export('alice', 100)
+    store.sync_directory(data_dir, store_dir)
+
+    write_export('alice', df.drop(columns='marks'))
+    _, changes = store.sync_directory(data_dir, store_dir)
+
+    assert changes == {}
+    _assert_rows(store.read_student('alice', store_dir), df)
+
+
+def test_snapshot_reads_use_the_compact_schema(write_export, data_dir, store_dir):
+    write_export('alice', 300)
+    store.sync_directory(data_dir, store_dir)
+
+    rows = store.read_student('alice', store_dir)
+
+    assert rows['date'].is_monotonic_increasing
+    assert list(rows['subject'].cat.categories) == sorted(rows['subject'].cat.categories)
+    for column, dtype in schema.COLUMN_DTYPES.items():
+        assert rows[column].dtype == dtype, column
+    # Columns point into the memory-mapped snapshot
+    with pytest.raises(ValueError):
+        rows['correct'].to_numpy()[0] = 0
+
+
+def test_manifest_records_the_memory_saved(write_export, data_dir, store_dir):
+    write_export('alice', 300)
+    manifest, _ = store.sync_directory(data_dir, store_dir)
+
+    memory = manifest['students']['alice']['memory']
+    assert 0 < memory['after_bytes'] < memory['before_bytes']
+    assert memory['saved_ratio'] == pytest.approx(1 - memory['after_bytes'] / memory['before_bytes'])
@@ -0,0 +1,222 @@
+import numpy as np
+import pandas as pd
+
+# Trend analytics over the aggregate cube.
+#
+# TrendIndex keeps running (prefix) sums over the date-sorted cube cells, once
+# for all subjects together and once per subject: the row counts, the metric
+# sums and the moments needed for a least-squares slope. The total over any
+# date window is then the difference of two prefix entries, so window means,
+# trailing 7/30-day means and slopes cost two binary searches and a
+# subtraction, however long the history is. The full rolling-mean and EWMA
+# series are derived from the same sums on first use and kept. New cells of
+# later days extend the prefix sums (TrendIndex.extend) without recomputing
+# the earlier entries.
+
+TREND_COLUMNS = ['percentage', 'accuracy_rate', 'attempt_rate']
+SHORT_WINDOW_DAYS = 7
+LONG_WINDOW_DAYS = 30
+EWMA_HALFLIFE_DAYS = 7
+
+DAY = np.timedelta64(1, 'D')
+
+
+class _PrefixSums:
+    # `cells` must be sorted by date
+    def __init__(self, cells, columns, origin):
+        self.dates = cells['date'].to_numpy()
+        self.k = len(columns)
+        stacked = self._stack(cells, columns, origin)
+        self.cumulative = np.vstack([np.zeros((1, stacked.shape[1])), np.cumsum(stacked, axis=0)])
+
+    @staticmethod
+    def _stack(cells, columns, origin):
+        dates = cells['date'].to_numpy()
+        n = cells['n'].to_numpy(dtype='float64')
+        sums = cells[columns].to_numpy(dtype='float64')
+        # Days since the dataset's first test, as the regression's x
+        x = ((dates - origin) / DAY).astype('float64')
+        k = len(columns)
+        # Layout: n | sums | sum(x) | sum(x^2) | sum(x*y) per column
+        stacked = np.empty((len(n), 2 * k + 3))
+        stacked[:, 0] = n
+        stacked[:, 1:k + 1] = sums
+        stacked[:, k + 1] = x * n
+        stacked[:, k + 2] = x * x * n
+        stacked[:, k + 3:] = x[:, None] * sums
+        return stacked
+
+    # Prefix sums with `cells` (all dated after the existing ones) added
+    def extend(self, cells, columns, origin):
+        extended = _PrefixSums.__new__(_PrefixSums)
+        extended.dates = np.concatenate([self.dates, cells['date'].to_numpy()])
+        extended.k = self.k
+        added = self.cumulative[-1] + np.cumsum(self._stack(cells, columns, origin), axis=0)
+        extended.cumulative = np.vstack([self.cumulative, added])
+        return extended
+
+    # [lo, hi) cells whose day lies in [start, end]
+    def bounds(self, start=None, end=None):
+        lo = 0 if start is None else self.dates.searchsorted(
+            pd.Timestamp(start).normalize().to_datetime64(), side='left')
+        hi = len(self.dates) if end is None else self.dates.searchsorted(
+            (pd.Timestamp(end).normalize() + pd.Timedelta(days=1)).to_datetime64(), side='left')
+        return lo, max(hi, lo)
+
+    def totals(self, lo, hi):
+        return self.cumulative[hi] - self.cumulative[lo]
+
+    def means(self, totals):
+        k = self.k
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return totals[..., 1:k + 1] / totals[..., :1]
+
+    # Least-squares slope of each metric against time, per day
+    def slopes(self, totals):
+        k = self.k
+        n, sx, sxx = totals[0], totals[k + 1], totals[k + 2]
+        sy, sxy = totals[1:k + 1], totals[k + 3:]
+        denominator = n * sxx - sx * sx
+        if denominator <= 1e-9 * max(n * sxx, 1):
+            return np.zeros(k)
+        return (n * sxy - sx * sy) / denominator
+
+    # Trailing `days`-day mean at every test date
+    def rolling(self, days):
+        dates = np.unique(self.dates)
+        hi = self.dates.searchsorted(dates, side='right')
+        lo = self.dates.searchsorted(dates - (days - 1) * DAY, side='left')
+        return dates, self.means(self.cumulative[hi] - self.cumulative[lo])
+
+
+class TrendIndex:
+    def __init__(self, cube, columns=TREND_COLUMNS):
+        self.columns = list(columns)
+        self._cells = len(cube)
+        self._origin = cube['date'].iloc[0].to_datetime64() if len(cube) else np.datetime64(0, 'ns')
+        self._all = _PrefixSums(cube, self.columns, self._origin)
+        self._subjects = {
+            subject: _PrefixSums(cube.iloc[rows], self.columns, self._origin)
+            for subject, rows in cube.groupby('subject', observed=True).indices.items()
+        }
+        self._series = {}
+
+    # Index over `cube`, which is this index's cube followed by cells of
+    # later days; the derived series are recomputed on next use
+    def extend(self, cube):
+        if self._cells == 0:
+            return TrendIndex(cube, self.columns)
+        cells = cube.iloc[self._cells:]
+        index = TrendIndex.__new__(TrendIndex)
+        index.columns = self.columns
+        index._cells = len(cube)
+        index._origin = self._origin
+        index._all = self._all.extend(cells, self.columns, self._origin)
+        index._subjects = dict(self._subjects)
+        for subject, rows in cells.groupby('subject', observed=True).indices.items():
+            added = cells.iloc[rows]
+            if subject in self._subjects:
+                index._subjects[subject] = self._subjects[subject].extend(added, self.columns, self._origin)
+            else:
+                index._subjects[subject] = _PrefixSums(added, self.columns, self._origin)
+        # Same subject order as a full build
+        index._subjects = {
+            subject: index._subjects[subject]
+            for subject in cube['subject'].cat.categories if subject in index._subjects
+        }
+        index._series = {}
+        return index
+
+    def subjects(self):
+        return list(self._subjects)
+
+    def _sums(self, subject):
+        if subject is None:
+            return self._all
+        return self._subjects.get(subject)
+
+    # Mean of each metric over the tests in [start, end]
+    def means(self, start=None, end=None, subject=None):
+        sums = self._sums(subject)
+        if sums is None:
+            return pd.Series(np.nan, index=self.columns)
+        return pd.Series(sums.means(sums.totals(*sums.bounds(start, end))), index=self.columns)
+
+    # Change per day of each metric over [start, end] (least squares)
+    def slope(self, start=None, end=None, subject=None):
+        sums = self._sums(subject)
+        if sums is None:
+            return pd.Series(0.0, index=self.columns)
+        return pd.Series(sums.slopes(sums.totals(*sums.bounds(start, end))), index=self.columns)
+
+    # Date of the last test in [start, end], or None
+    def last_date(self, start=None, end=None, subject=None):
+        sums = self._sums(subject)
+        if sums is None:
+            return None
+        lo, hi = sums.bounds(start, end)
+        return pd.Timestamp(sums.dates[hi - 1]) if hi > lo else None
+
+    # Mean over the last `days` days of [start, end] (never before start)
+    def trailing_means(self, days, start=None, end=None, subject=None):
+        last = self.last_date(start, end, subject)
+        if last is None:
+            return pd.Series(np.nan, index=self.columns)
+        window_start = last - pd.Timedelta(days=days - 1)
+        if start is not None:
+            window_start = max(window_start, pd.Timestamp(start))
+        return self.means(window_start, last, subject)
+
+    # Short-term minus long-term trailing mean at the end of [start, end]:
+    # positive when recent tests are above the longer-run level
+    def momentum(self, start=None, end=None, subject=None,
+                 short_days=SHORT_WINDOW_DAYS, long_days=LONG_WINDOW_DAYS):
+        change = (self.trailing_means(short_days, start, end, subject)
+                  - self.trailing_means(long_days, start, end, subject))
+        return change.fillna(0).to_dict()
+
+    # Trailing `days`-day mean at every test date (whole history)
+    def rolling(self, days, subject=None):
+        key = ('rolling', days, subject)
+        if key not in self._series:
+            sums = self._sums(subject)
+            dates, means = sums.rolling(days)
+            self._series[key] = pd.DataFrame(means, columns=self.columns).assign(date=dates)[
+                ['date'] + self.columns]
+        return self._series[key]
+
+    # Exponentially weighted daily means (time-aware half-life)
+    def ewma(self, subject=None, halflife_days=EWMA_HALFLIFE_DAYS):
+        key = ('ewma', halflife_days, subject)
+        if key not in self._series:
+            daily = self.rolling(1, subject)
+            smoothed = daily[self.columns].ewm(
+                halflife=pd.Timedelta(days=halflife_days), times=daily['date']
+            ).mean()
+            self._series[key] = daily[['date']].join(smoothed)
+        return self._series[key]
+
+    # Value of a cached series at the last test in [start, end]
+    def _at_end(self, series, start, end, subject):
+        last = self.last_date(start, end, subject)
+        if last is None:
+            return pd.Series(np.nan, index=self.columns)
+        row = series['date'].to_numpy().searchsorted(last.to_datetime64(), side='right') - 1
+        return series[self.columns].iloc[row]
+
+    # Per-subject trend table for [start, end]
+    def subject_summary(self, start=None, end=None, subject=None, column='percentage'):
+        rows = []
+        for subject in self.subjects() if subject is None else [subject]:
+            if self.last_date(start, end, subject) is None:
+                continue
+            rows.append({
+                'subject': subject,
+                f'{SHORT_WINDOW_DAYS}_day_mean': self.trailing_means(SHORT_WINDOW_DAYS, start, end, subject)[column],
+                f'{LONG_WINDOW_DAYS}_day_mean': self.trailing_means(LONG_WINDOW_DAYS, start, end, subject)[column],
+                # The EWMA carries weight from before `start` by design
+                'ewma': self._at_end(self.ewma(subject), start, end, subject)[column],
+                'slope_per_week': self.slope(start, end, subject)[column] * 7,
+            })
+        return pd.DataFrame(rows, columns=['subject', f'{SHORT_WINDOW_DAYS}_day_mean',
+                                           f'{LONG_WINDOW_DAYS}_day_mean', 'ewma', 'slope_per_week'])